@@ -0,0 +1,280 @@
+"""
+Benchmarks for the LRU caches in problem 1.
+
+Run from the repository root with:
+
+    python -m benchmarks.bench_problem_1
+"""
+
+import itertools
+import os
+import random
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+
+from src.problem_1 import POLICIES, IntLRUCache, LRU_Cache, ShardedLRUCache
+
+
+class _LockedLRUCache(object):
+    """The current LRU_Cache serialised behind one external lock."""
+
+    def __init__(self, capacity: int):
+        self.cache = LRU_Cache(capacity)
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            return self.cache.get(key)
+
+    def set(self, key, value):
+        with self.lock:
+            self.cache.set(key, value)
+
+
+def _run_threads(cache, threads: int, ops_per_thread: int, key_space: int) -> float:
+    """
+    Hammer the cache from several threads and return the throughput in ops/s.
+
+    Every thread does a 4:1 mix of get and set over random keys.
+    """
+    rng = random.Random(0)
+    workloads = [
+        [rng.randrange(key_space) for _ in range(ops_per_thread)]
+        for _ in range(threads)
+    ]
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(keys):
+        barrier.wait()
+        for i, key in enumerate(keys):
+            if i % 5 == 0:
+                cache.set(key, key)
+            else:
+                cache.get(key)
+
+    pool = [threading.Thread(target=worker, args=(keys,)) for keys in workloads]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return threads * ops_per_thread / elapsed
+
+
+def bench_sharded_scaling(
+    thread_counts=(1, 2, 4, 8),
+    capacity: int = 10_000,
+    shards: int = 16,
+    ops_per_thread: int = 100_000,
+):
+    """Compare ShardedLRUCache against a single locked LRU_Cache per thread count."""
+    print(f"{'threads':>8} {'locked LRU_Cache':>18} {'ShardedLRUCache':>18}")
+    for threads in thread_counts:
+        locked = _run_threads(
+            _LockedLRUCache(capacity), threads, ops_per_thread, capacity * 2
+        )
+        sharded = _run_threads(
+            ShardedLRUCache(capacity, shards), threads, ops_per_thread, capacity * 2
+        )
+        print(f"{threads:>8} {locked:>14,.0f}/s {sharded:>14,.0f}/s")
+
+
+def zipf_trace(length: int, keys: int, exponent: float = 1.0, seed: int = 0) -> list:
+    """Keys drawn from a Zipf distribution, key 0 being the most popular."""
+    rng = random.Random(seed)
+    cum_weights = list(
+        itertools.accumulate(1 / (rank**exponent) for rank in range(1, keys + 1))
+    )
+    return rng.choices(range(keys), cum_weights=cum_weights, k=length)
+
+
+def scan_trace(
+    length: int, keys: int, scan_length: int, scan_every: int, seed: int = 0
+) -> list:
+    """A Zipf trace interrupted every scan_every requests by a scan of new cold keys."""
+    trace = []
+    cold = keys
+    for start in range(0, length, scan_every):
+        trace.extend(zipf_trace(scan_every, keys, seed=seed + start))
+        trace.extend(range(cold, cold + scan_length))
+        cold += scan_length
+    return trace
+
+
+def replay(cache, trace) -> float:
+    """Replay a trace as read-through traffic and return the hit ratio."""
+    hits = 0
+    for key in trace:
+        if cache.get(key, None) is None:
+            cache.set(key, key)
+        else:
+            hits += 1
+    return hits / len(trace)
+
+
+def bench_policy_hit_ratio(capacity: int = 1_000, length: int = 200_000):
+    """Compare the hit ratios of every eviction policy on Zipf and scan traces."""
+    traces = {
+        "zipf": zipf_trace(length, 20 * capacity),
+        "zipf+scan": scan_trace(length, 20 * capacity, 2 * capacity, 10 * capacity),
+    }
+    policies = ["lru"] + sorted(POLICIES)
+    print(f"{'trace':>10}" + "".join(f"{policy:>10}" for policy in policies))
+    for name, trace in traces.items():
+        ratios = [
+            replay(LRU_Cache(capacity, policy=policy), trace) for policy in policies
+        ]
+        print(f"{name:>10}" + "".join(f"{ratio:>10.2%}" for ratio in ratios))
+
+
+def bench_bulk_operations(
+    batch: int = 50, batches: int = 20_000, capacity: int = 10_000
+):
+    """Compare the per-key cost of get_many/set_many against loops of get/set."""
+    rng = random.Random(0)
+    key_batches = [
+        [rng.randrange(capacity) for _ in range(batch)] for _ in range(batches)
+    ]
+    mappings = [{key: key for key in keys} for keys in key_batches]
+    keys_total = batch * batches
+
+    def per_key(run) -> float:
+        start = time.perf_counter()
+        run()
+        return (time.perf_counter() - start) / keys_total * 1e9
+
+    cache = LRU_Cache(capacity)
+
+    def set_loop():
+        for mapping in mappings:
+            for key, value in mapping.items():
+                cache.set(key, value)
+
+    def set_many():
+        for mapping in mappings:
+            cache.set_many(mapping)
+
+    def get_loop():
+        for keys in key_batches:
+            {key: cache.get(key) for key in keys}
+
+    def get_many():
+        for keys in key_batches:
+            cache.get_many(keys)
+
+    print(f"{'operation':>10} {'loop':>12} {'bulk':>12}")
+    print(f"{'set':>10} {per_key(set_loop):>9.0f} ns {per_key(set_many):>9.0f} ns")
+    print(f"{'get':>10} {per_key(get_loop):>9.0f} ns {per_key(get_many):>9.0f} ns")
+
+
+class _BareLRUCache(object):
+    """The original OrderedDict LRU_Cache without any options, as a reference."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.cache = OrderedDict()
+
+    def get(self, key):
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        return -1
+
+    def set(self, key, value):
+        if key in self.cache:
+            self.cache.move_to_end(key)
+        elif len(self.cache) >= self.capacity:
+            self.cache.popitem(last=False)
+        self.cache[key] = value
+
+
+def bench_stats_overhead(capacity: int = 10_000, ops: int = 500_000):
+    """Compare get/set cost with statistics disabled and enabled against a bare LRU."""
+    rng = random.Random(0)
+    keys = [rng.randrange(2 * capacity) for _ in range(ops)]
+
+    def per_op(cache) -> tuple:
+        start = time.perf_counter()
+        for key in keys:
+            cache.set(key, key)
+        set_ns = (time.perf_counter() - start) / ops * 1e9
+        start = time.perf_counter()
+        for key in keys:
+            cache.get(key)
+        get_ns = (time.perf_counter() - start) / ops * 1e9
+        return set_ns, get_ns
+
+    caches = {
+        "bare": _BareLRUCache(capacity),
+        "stats off": LRU_Cache(capacity),
+        "stats on": LRU_Cache(capacity, stats=True),
+    }
+    print(f"{'cache':>10} {'set':>10} {'get':>10}")
+    for name, cache in caches.items():
+        set_ns, get_ns = per_op(cache)
+        print(f"{name:>10} {set_ns:>7.0f} ns {get_ns:>7.0f} ns")
+
+
+def bench_dump_load(entries: int = 1_000_000):
+    """Time dump() and load() of a cache of int entries and report the file size."""
+    cache = LRU_Cache(entries)
+    cache.set_many({i: i * 7 for i in range(entries)})
+    restored = LRU_Cache(entries)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "cache.bin")
+        start = time.perf_counter()
+        cache.dump(path)
+        dump_seconds = time.perf_counter() - start
+        size = os.path.getsize(path)
+        start = time.perf_counter()
+        restored.load(path)
+        load_seconds = time.perf_counter() - start
+    print(
+        f"{entries:,} entries: dump {dump_seconds:.2f}s, load {load_seconds:.2f}s, "
+        f"{size / entries:.1f} bytes per entry"
+    )
+
+
+def bench_int_cache_memory(entries: int = 1_000_000):
+    """Compare the memory per entry and get/set cost of IntLRUCache and LRU_Cache."""
+    # Keys and values above 256 so CPython cannot share cached small ints
+    keys = range(1_000, 1_000 + entries)
+    print(f"{'cache':>12} {'bytes/entry':>12} {'set':>10} {'get':>10}")
+    for cls in (LRU_Cache, IntLRUCache):
+        cache = cls(entries)
+        start = time.perf_counter()
+        for key in keys:
+            cache.set(key, key + entries)
+        set_ns = (time.perf_counter() - start) / entries * 1e9
+        start = time.perf_counter()
+        for key in keys:
+            cache.get(key)
+        get_ns = (time.perf_counter() - start) / entries * 1e9
+        del cache
+
+        # Measured separately since tracing slows every allocation down
+        tracemalloc.start()
+        cache = cls(entries)
+        for key in keys:
+            cache.set(key, key + entries)
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del cache
+        print(
+            f"{cls.__name__:>12} {size / entries:>12.1f} "
+            f"{set_ns:>7.0f} ns {get_ns:>7.0f} ns"
+        )
+
+
+if __name__ == "__main__":
+    bench_sharded_scaling()
+    bench_policy_hit_ratio()
+    bench_bulk_operations()
+    bench_stats_overhead()
+    bench_dump_load()
+    bench_int_cache_memory()
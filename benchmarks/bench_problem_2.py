@@ -0,0 +1,214 @@
+"""
+Benchmarks for the file search in problem 2.
+
+Run from the repository root with:
+
+    python -m benchmarks.bench_problem_2
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from src.problem_2 import FileIndex, find_files, iter_files
+
+
+def make_tree(
+    root: str,
+    depth: int,
+    fanout: int,
+    files_per_dir: int,
+    match_ratio: float = 0.5,
+    suffix: str = ".c",
+    seed: int = 0,
+) -> int:
+    """
+    Create a reproducible tree of empty files under root.
+
+    Every directory down to depth holds files_per_dir files and fanout
+    subdirectories. Each file ends with suffix with probability match_ratio,
+    and with ".txt" otherwise.
+
+    Returns:
+        int: The number of files that end with suffix.
+    """
+    rng = random.Random(seed)
+    matches = 0
+    stack = [(root, 0)]
+    while stack:
+        directory, level = stack.pop()
+        os.makedirs(directory, exist_ok=True)
+        for i in range(files_per_dir):
+            name = f"f{i}{suffix if rng.random() < match_ratio else '.txt'}"
+            matches += name.endswith(suffix)
+            open(os.path.join(directory, name), "w").close()
+        if level < depth:
+            for i in range(fanout):
+                stack.append((os.path.join(directory, f"d{i}"), level + 1))
+    return matches
+
+
+def remove_tree(root: str) -> None:
+    """Delete a tree without recursion, since shutil.rmtree fails on very deep trees."""
+    directories = []
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        directories.append(directory)
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                else:
+                    os.unlink(entry.path)
+    for directory in reversed(directories):
+        os.rmdir(directory)
+
+
+def find_files_recursive(suffix: str, path: str) -> list:
+    """The original recursive find_files, kept as the baseline."""
+    result = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith(suffix):
+                    result.append(entry.path)
+                elif entry.is_dir():
+                    result.extend(find_files_recursive(suffix, entry.path))
+    except PermissionError:
+        print(f"Permission denied: {path}")
+    return result
+
+
+def _measure(search) -> tuple:
+    """Return time to first result, total time and peak traced memory of a search."""
+    start = time.perf_counter()
+    results = iter(search())
+    next(results, None)
+    first_seconds = time.perf_counter() - start
+    for _ in results:
+        pass
+    total_seconds = time.perf_counter() - start
+
+    # Measured on a second run since tracing slows every allocation down
+    tracemalloc.start()
+    for _ in search():
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return first_seconds, total_seconds, peak
+
+
+def bench_iter_files():
+    """Compare the recursive baseline, find_files and iter_files on wide and deep trees."""
+    shapes = {
+        "wide": dict(depth=3, fanout=12, files_per_dir=40),
+        "deep": dict(depth=sys.getrecursionlimit() + 200, fanout=1, files_per_dir=2),
+    }
+    searches = {
+        "recursive": find_files_recursive,
+        "find_files": find_files,
+        "iter_files": iter_files,
+    }
+    print(f"{'tree':>6} {'search':>12} {'first':>10} {'total':>10} {'peak':>10}")
+    for shape, options in shapes.items():
+        root = tempfile.mkdtemp()
+        try:
+            make_tree(root, **options)
+            for name, search in searches.items():
+                try:
+                    first, total, peak = _measure(lambda: search(".c", root))
+                except RecursionError:
+                    print(f"{shape:>6} {name:>12} {'RecursionError':>32}")
+                    continue
+                print(
+                    f"{shape:>6} {name:>12} {first * 1e3:>7.2f} ms "
+                    f"{total * 1e3:>7.1f} ms {peak / 1024:>7.0f} KiB"
+                )
+        finally:
+            remove_tree(root)
+
+
+def bench_workers(worker_counts=(1, 2, 4, 8, 16)):
+    """Time find_files over a synthetic tree for each number of workers."""
+    root = tempfile.mkdtemp()
+    try:
+        make_tree(root, depth=3, fanout=10, files_per_dir=20)
+        print(f"{'workers':>8} {'ordered':>10} {'unordered':>10}")
+        for workers in worker_counts:
+            timings = []
+            for ordered in (True, False):
+                start = time.perf_counter()
+                find_files(".c", root, workers=workers, ordered=ordered)
+                timings.append(time.perf_counter() - start)
+            print(
+                f"{workers:>8} {timings[0] * 1e3:>7.1f} ms {timings[1] * 1e3:>7.1f} ms"
+            )
+    finally:
+        remove_tree(root)
+
+
+def bench_index(depth: int = 4, fanout: int = 8, files_per_dir: int = 20):
+    """Compare a full rescan with cold, warm and reloaded FileIndex queries."""
+    root = tempfile.mkdtemp()
+    index_path = os.path.join(tempfile.mkdtemp(), "index.json")
+    try:
+        make_tree(root, depth=depth, fanout=fanout, files_per_dir=files_per_dir)
+        index = FileIndex(index_path)
+        # The tree was just generated, so trust its mtimes straight away
+        index.mtime_granularity_ns = 0
+
+        def timed(run) -> float:
+            start = time.perf_counter()
+            run()
+            return (time.perf_counter() - start) * 1e3
+
+        def reload_and_query():
+            reloaded = FileIndex(index_path)
+            reloaded.mtime_granularity_ns = 0
+            find_files(".c", root, index=reloaded)
+
+        results = {
+            "full rescan": timed(lambda: find_files(".c", root)),
+            "cold index": timed(lambda: find_files(".c", root, index=index)),
+            "warm index": timed(lambda: find_files(".c", root, index=index)),
+            "save": timed(index.save),
+            "load + query": timed(reload_and_query),
+        }
+        print(f"{len(index.directories):,} directories")
+        for name, milliseconds in results.items():
+            print(f"{name:>14} {milliseconds:>8.1f} ms")
+    finally:
+        remove_tree(root)
+        remove_tree(os.path.dirname(index_path))
+
+
+def bench_pruning(depth: int = 4, fanout: int = 8, files_per_dir: int = 20):
+    """Time a full walk against walks that exclude subtrees or stop at a depth."""
+    root = tempfile.mkdtemp()
+    try:
+        make_tree(root, depth=depth, fanout=fanout, files_per_dir=files_per_dir)
+        # d0 in every directory stands in for a .git or node_modules subtree
+        searches = {
+            "full walk": lambda: find_files(".c", root),
+            "exclude d0": lambda: find_files(".c", root, exclude=["d0"]),
+            "exclude d0-d3": lambda: find_files(".c", root, exclude=["d[0-3]"]),
+            "max_depth 2": lambda: find_files(".c", root, max_depth=2),
+            "no symlinks": lambda: find_files(".c", root, follow_symlinks=False),
+        }
+        for name, search in searches.items():
+            found = len(search())
+            _, seconds, _ = _measure(search)
+            print(f"{name:>14} {seconds * 1e3:>8.1f} ms {found:>9,} files")
+    finally:
+        remove_tree(root)
+
+
+if __name__ == "__main__":
+    bench_iter_files()
+    bench_workers()
+    bench_index()
+    bench_pruning()
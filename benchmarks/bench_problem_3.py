@@ -0,0 +1,276 @@
+"""
+Benchmarks for the Huffman coding in problem 3.
+
+Run from the repository root with:
+
+    python -m benchmarks.bench_problem_3
+"""
+
+import os
+import pickle
+import random
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+
+import src.problem_3
+from src.problem_3 import (
+    DecodeTable,
+    bit_codes,
+    build_tree,
+    byte_frequency,
+    canonical_codes,
+    code_length_cost,
+    compress_blocks,
+    compress_stream,
+    decompress_blocks,
+    decompress_stream,
+    generate_codes,
+    huffman_decoding,
+    huffman_encoding,
+    limited_code_lengths,
+    pack_bits,
+    pack_bytes,
+)
+
+WORDS = (
+    "the of and to in is was that for it with as his on be at by had this not "
+    "are but from or have an they which one you were all her she there would "
+    "their we him been has when who will more no if out so said what up its "
+    "about into than them can only other new some could time these two may then"
+).split()
+
+
+def make_text(size: int, seed: int = 0) -> str:
+    """Return size characters of reproducible text, words drawn with a Zipf-like skew."""
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, len(WORDS) + 1)]
+    words = []
+    length = 0
+    while length < size:
+        chunk = rng.choices(WORDS, weights, k=1000)
+        words.extend(chunk)
+        length += sum(map(len, chunk)) + len(chunk)
+    return " ".join(words)[:size]
+
+
+def _timed(run) -> tuple:
+    start = time.perf_counter()
+    result = run()
+    return result, time.perf_counter() - start
+
+
+def bench_packed(sizes=(1 << 20, 4 << 20)):
+    """Compare the '0'/'1' string output with packed bytes on multi-megabyte text."""
+    print(f"{'input':>8} {'output':>8} {'size':>12} {'encode':>10} {'decode':>10}")
+    for size in sizes:
+        data = make_text(size)
+        (encoded_data, tree), encode = _timed(lambda: huffman_encoding(data))
+        decoded, decode = _timed(lambda: huffman_decoding(encoded_data, tree))
+        assert decoded == data
+        print(
+            f"{size >> 20:>5} MB {'str':>8} {len(encoded_data):>12,} "
+            f"{encode:>8.2f} s {decode:>8.2f} s"
+        )
+        del encoded_data
+
+        (packed, bit_length, tree), encode = _timed(
+            lambda: huffman_encoding(data, packed=True)
+        )
+        decoded, decode = _timed(lambda: huffman_decoding(packed, tree, bit_length))
+        assert decoded == data
+        print(
+            f"{size >> 20:>5} MB {'packed':>8} {len(packed):>12,} "
+            f"{encode:>8.2f} s {decode:>8.2f} s"
+        )
+
+
+def bench_decode_table(size: int = 4 << 20, widths=(4, 8, 10, 12, 16)):
+    """Compare the bit by bit tree walk with table-driven decoding at several table widths."""
+    data = make_text(size)
+    packed, bit_length, tree = huffman_encoding(data, packed=True)
+    codes = generate_codes(tree)
+    print(f"{len(codes)} characters, codes up to {max(map(len, codes.values()))} bits")
+
+    decoded, seconds = _timed(lambda: huffman_decoding(packed, tree, bit_length))
+    assert decoded == data
+    print(
+        f"{'tree walk':>10} {'':>10} {seconds:>7.2f} s {size / seconds / 1e6:>6.1f} MB/s"
+    )
+    for width in widths:
+        decoder, build = _timed(lambda: DecodeTable(codes, width))
+        decoded, seconds = _timed(lambda: decoder.decode(packed, bit_length))
+        assert decoded == data
+        print(
+            f"{f'{width} bits':>10} {build * 1e3:>7.1f} ms {seconds:>7.2f} s "
+            f"{size / seconds / 1e6:>6.1f} MB/s"
+        )
+
+
+def bench_header(size: int = 1 << 20):
+    """Compare storing a pickled tree with the canonical code header."""
+    data = make_text(size) + "".join(map(chr, range(0x20, 0x250)))
+    packed, bit_length, tree = huffman_encoding(data, packed=True)
+    payload, _ = huffman_encoding(data, header=True)
+    pickled = pickle.dumps(tree, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def from_pickle():
+        return huffman_decoding(packed, pickle.loads(pickled), bit_length, 10)
+
+    decoded, pickle_seconds = _timed(from_pickle)
+    assert decoded == data
+    decoded, header_seconds = _timed(lambda: huffman_decoding(payload))
+    assert decoded == data
+    print(f"{'':>8} {'overhead':>10} {'decode':>10}")
+    print(f"{'pickle':>8} {len(pickled):>8,} B {pickle_seconds:>8.3f} s")
+    print(f"{'header':>8} {len(payload) - len(packed):>8,} B {header_seconds:>8.3f} s")
+
+
+def _traced(run) -> tuple:
+    """Return the time and peak traced memory of run."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    run()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def bench_stream(size: int = 8 << 20, chunk_sizes=(1 << 12, 1 << 16, 1 << 20)):
+    """Compare the peak memory of whole-input encoding with streaming at several chunk sizes."""
+    directory = tempfile.mkdtemp()
+    text_path = os.path.join(directory, "input.txt")
+    compressed_path = os.path.join(directory, "input.huf")
+    try:
+        with open(text_path, "w") as file:
+            file.write(make_text(size))
+
+        def whole():
+            with open(text_path) as file:
+                huffman_encoding(file.read(), header=True)
+
+        seconds, peak = _traced(whole)
+        print(f"{size >> 20} MB input, times include tracemalloc overhead")
+        print(f"{'whole input':>14} {seconds:>7.2f} s {peak / 1024:>10,.0f} KiB")
+        for chunk_size in chunk_sizes:
+
+            def compress():
+                with open(text_path) as source:
+                    with open(compressed_path, "wb") as destination:
+                        compress_stream(source, destination, chunk_size)
+
+            def decompress():
+                with open(compressed_path, "rb") as source:
+                    with open(os.devnull, "w") as destination:
+                        decompress_stream(source, destination)
+
+            compress_seconds, compress_peak = _traced(compress)
+            decompress_seconds, decompress_peak = _traced(decompress)
+            print(
+                f"{f'{chunk_size >> 10} KiB chunks':>14} "
+                f"{compress_seconds:>7.2f} s {compress_peak / 1024:>10,.0f} KiB "
+                f"decode {decompress_seconds:>7.2f} s "
+                f"{decompress_peak / 1024:>10,.0f} KiB"
+            )
+    finally:
+        for path in (text_path, compressed_path):
+            if os.path.exists(path):
+                os.unlink(path)
+        os.rmdir(directory)
+
+
+def bench_blocks(size: int = 128 << 20, block_size: int = 1 << 20, worker_counts=None):
+    """Time block-parallel encoding and decoding for each number of worker processes."""
+    if worker_counts is None:
+        worker_counts = sorted({1, 2, 4, os.cpu_count() or 1})
+    data = make_text(size)
+    print(
+        f"{size >> 20} MB input, {block_size >> 10} KiB blocks, {os.cpu_count()} CPUs"
+    )
+    print(f"{'workers':>8} {'encode':>10} {'decode':>10} {'speedup':>8}")
+    baseline = None
+    for workers in worker_counts:
+        payload, encode = _timed(lambda: compress_blocks(data, block_size, workers))
+        decoded, decode = _timed(lambda: decompress_blocks(payload, workers))
+        assert decoded == data
+        baseline = baseline or encode + decode
+        print(
+            f"{workers:>8} {encode:>8.2f} s {decode:>8.2f} s "
+            f"{baseline / (encode + decode):>7.2f}x"
+        )
+
+
+def bench_bytes(size: int = 8 << 20):
+    """Compare counting and packing bytes with the str path, in MB/s."""
+    text = make_text(size)
+    data = text.encode()
+    codes = bit_codes(generate_codes(build_tree(Counter(data))))
+    codes_of_text = bit_codes(generate_codes(build_tree(Counter(text))))
+    numpy = src.problem_3.np
+    runs = {
+        "Counter(str)": lambda: Counter(text),
+        "pack_bits(str)": lambda: pack_bits(text, codes_of_text),
+        "byte_frequency": lambda: byte_frequency(data),
+        "pack_bytes": lambda: pack_bytes(data, codes),
+        "encode str": lambda: huffman_encoding(text, packed=True),
+        "encode bytes": lambda: huffman_encoding(data, packed=True),
+    }
+    print(f"{size >> 20} MB input, NumPy {'installed' if numpy else 'not installed'}")
+    for name, run in runs.items():
+        _, seconds = _timed(run)
+        print(f"{name:>26} {seconds:>7.2f} s {size / seconds / 1e6:>7.1f} MB/s")
+    if numpy is not None:
+        # The same byte functions with the fallbacks
+        src.problem_3.np = None
+        try:
+            for name in ("byte_frequency", "pack_bytes", "encode bytes"):
+                _, seconds = _timed(runs[name])
+                name = f"{name} (no NumPy)"
+                print(f"{name:>26} {seconds:>7.2f} s {size / seconds / 1e6:>7.1f} MB/s")
+        finally:
+            src.problem_3.np = numpy
+
+
+def bench_length_limit(size: int = 2 << 20, limits=(9, 10, 12, 14, 16)):
+    """Report the compression cost of capping code lengths, and the table it allows."""
+    # A long tail of rare characters gives long codes
+    rng = random.Random(1)
+    tail = "".join(chr(0x100 + rng.randrange(400)) for _ in range(size // 1000))
+    data = make_text(size - len(tail)) + tail
+    frequency = Counter(data)
+    codes = generate_codes(build_tree(frequency))
+    longest = max(map(len, codes.values()))
+    packed, bit_length, tree = huffman_encoding(data, packed=True)
+    decoder = DecodeTable(codes, 10)
+    subtables = sum(len(used[1]) for chars, used in decoder.table if chars is None)
+    decoded, seconds = _timed(lambda: decoder.decode(packed, bit_length))
+    assert decoded == data
+    print(f"{len(frequency)} characters, Huffman codes up to {longest} bits")
+    print(f"{'limit':>6} {'cost':>8} {'entries':>9} {'decode':>10}")
+    print(
+        f"{'none':>6} {0:>7.3%} {len(decoder.table) + subtables:>9,} "
+        f"{seconds:>8.2f} s  (10 bit table with subtables)"
+    )
+    for limit in limits:
+        report = code_length_cost(frequency, limit)
+        limited = canonical_codes(limited_code_lengths(frequency, limit))
+        decoder = DecodeTable(limited, limit)
+        packed, bit_length = pack_bits(data, bit_codes(limited))
+        decoded, seconds = _timed(lambda: decoder.decode(packed, bit_length))
+        assert decoded == data
+        print(
+            f"{limit:>6} {report['cost']:>7.3%} {len(decoder.table):>9,} "
+            f"{seconds:>8.2f} s"
+        )
+
+
+if __name__ == "__main__":
+    bench_packed()
+    bench_decode_table()
+    bench_header()
+    bench_stream()
+    bench_blocks()
+    bench_bytes()
+    bench_length_limit()
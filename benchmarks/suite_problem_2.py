@@ -0,0 +1,333 @@
+"""
+Synthetic filesystem benchmark suite for the file search in problem 2.
+
+Generates reproducible trees and runs every traversal mode over each of them,
+reporting wall time, the number of filesystem calls and peak traced memory.
+Results can be saved and compared against an earlier run, so a change to
+find_files can be checked before and after. Run from the repository root with:
+
+    python -m benchmarks.suite_problem_2
+    python -m benchmarks.suite_problem_2 --save before.json
+    python -m benchmarks.suite_problem_2 --baseline before.json
+    python -m benchmarks.suite_problem_2 --scenarios 1m --tree-dir /var/tmp/trees
+
+The 1m scenario holds a million files and is only run when asked for. Pass
+--tree-dir to keep generated trees between runs instead of building them in a
+temporary directory each time.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from benchmarks.bench_problem_2 import find_files_recursive, make_tree, remove_tree
+from src.problem_2 import FileIndex, async_find_files, find_files, match_files
+
+# The shape of each tree, passed to make_tree
+SCENARIOS = {
+    "small": dict(depth=2, fanout=8, files_per_dir=20, match_ratio=0.5),
+    "deep": dict(depth=sys.getrecursionlimit() + 200, fanout=1, files_per_dir=5),
+    "wide": dict(depth=2, fanout=40, files_per_dir=30, match_ratio=0.5),
+    "sparse": dict(depth=3, fanout=10, files_per_dir=50, match_ratio=0.01),
+    "dense": dict(depth=3, fanout=10, files_per_dir=50, match_ratio=0.99),
+    "1m": dict(depth=4, fanout=10, files_per_dir=90, match_ratio=0.5),
+}
+DEFAULT_SCENARIOS = ["small", "deep", "wide", "sparse", "dense"]
+
+# The filesystem calls of the os module that are counted
+COUNTED_CALLS = ("scandir", "listdir", "stat", "lstat")
+
+
+def _async_search(suffix: str, root: str) -> list:
+    async def collect():
+        return [path async for path in async_find_files(suffix, root)]
+
+    return asyncio.run(collect())
+
+
+def _cold_index_search(suffix: str, root: str) -> list:
+    index = FileIndex()
+    index.mtime_granularity_ns = 0
+    return find_files(suffix, root, index=index)
+
+
+def _warm_index_search():
+    # One index per tree, filled by the first run
+    indexes = {}
+
+    def search(suffix: str, root: str) -> list:
+        if root not in indexes:
+            indexes[root] = FileIndex()
+            indexes[root].mtime_granularity_ns = 0
+            find_files(suffix, root, index=indexes[root])
+        return find_files(suffix, root, index=indexes[root])
+
+    return search
+
+
+# Each traversal mode as a function of (suffix, root) returning the matches
+MODES = {
+    "recursive": find_files_recursive,
+    "find_files": find_files,
+    "workers=4": lambda suffix, root: find_files(suffix, root, workers=4),
+    "unordered": lambda suffix, root: find_files(
+        suffix, root, workers=4, ordered=False
+    ),
+    "async": _async_search,
+    "index cold": _cold_index_search,
+    "index warm": _warm_index_search(),
+    "match_files": lambda suffix, root: match_files([suffix], root)[suffix],
+}
+BASELINE_MODE = "recursive"
+
+
+class CallCounter:
+    """
+    Count the calls made to the filesystem functions of the os module.
+
+    The entries os.scandir returns are wrapped, so the stat calls of each
+    os.DirEntry are counted as well, once per entry and follow_symlinks
+    value, as DirEntry caches the result. The stat os.DirEntry makes on its
+    own to answer is_dir() or is_file() for a symlink, or on filesystems
+    that do not report file types, is still not seen, but the synthetic
+    trees have no symlinks.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.lock = threading.Lock()
+        self.originals = {}
+
+    def __enter__(self):
+        for name in COUNTED_CALLS:
+            original = self.originals[name] = getattr(os, name)
+            setattr(os, name, self._counting(original))
+        scandir = os.scandir
+        os.scandir = lambda *args, **kwargs: _CountedEntries(
+            scandir(*args, **kwargs), self
+        )
+        return self
+
+    def __exit__(self, *exc_info):
+        for name, original in self.originals.items():
+            setattr(os, name, original)
+
+    def count(self) -> None:
+        with self.lock:
+            self.calls += 1
+
+    def _counting(self, original):
+        def counted(*args, **kwargs):
+            self.count()
+            return original(*args, **kwargs)
+
+        return counted
+
+
+class _CountedEntries:
+    """The iterator os.scandir returns, yielding entries that count their stat calls."""
+
+    def __init__(self, entries, counter: CallCounter):
+        self.entries = entries
+        self.counter = counter
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.entries.close()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return _CountedEntry(next(self.entries), self.counter)
+
+    def close(self) -> None:
+        self.entries.close()
+
+
+class _CountedEntry:
+    def __init__(self, entry, counter: CallCounter):
+        self.entry = entry
+        self.counter = counter
+        self.stated = set()
+
+    def __getattr__(self, name):
+        return getattr(self.entry, name)
+
+    def __fspath__(self):
+        return self.entry.path
+
+    def stat(self, *, follow_symlinks=True):
+        if follow_symlinks not in self.stated:
+            self.stated.add(follow_symlinks)
+            self.counter.count()
+        return self.entry.stat(follow_symlinks=follow_symlinks)
+
+
+def build_tree(name: str, tree_dir: str = None) -> str:
+    """
+    Return the root of the tree for scenario name, generating it if needed.
+
+    With tree_dir, the tree is kept at tree_dir/name next to a JSON file of
+    its shape, and only generated again if the shape changed.
+    """
+    options = SCENARIOS[name]
+    if tree_dir is None:
+        root = tempfile.mkdtemp()
+        make_tree(root, **options)
+        return root
+
+    root = os.path.join(tree_dir, name)
+    shape_path = root + ".json"
+    if os.path.exists(shape_path):
+        with open(shape_path) as file:
+            if json.load(file) == options:
+                return root
+    if os.path.exists(root):
+        remove_tree(root)
+    make_tree(root, **options)
+    with open(shape_path, "w") as file:
+        json.dump(options, file)
+    return root
+
+
+def measure(search, root: str, suffix: str = ".c", repeat: int = 3) -> dict:
+    """
+    Run one traversal mode over a tree.
+
+    A first untimed run warms the OS caches, and the index of the index warm
+    mode. The time is the best of repeat runs after it. Calls and peak memory
+    are measured on separate runs, so neither the counting nor tracemalloc
+    slow the timed ones.
+
+    Returns:
+        dict: seconds, calls, peak (bytes) and files (the number of matches)
+    """
+    search(suffix, root)
+    seconds = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        files = len(search(suffix, root))
+        seconds = min(seconds, time.perf_counter() - start)
+
+    with CallCounter() as counter:
+        search(suffix, root)
+
+    tracemalloc.start()
+    search(suffix, root)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": seconds, "calls": counter.calls, "peak": peak, "files": files}
+
+
+def run_suite(
+    scenarios=DEFAULT_SCENARIOS, modes=None, repeat: int = 3, tree_dir: str = None
+) -> dict:
+    """
+    Measure every mode over every scenario, printing each result as it comes.
+
+    Returns:
+        dict: The measurements of each mode, keyed by scenario and then mode.
+    """
+    results = {}
+    for scenario in scenarios:
+        root = build_tree(scenario, tree_dir)
+        try:
+            results[scenario] = {}
+            for mode in modes or MODES:
+                try:
+                    result = measure(MODES[mode], root, repeat=repeat)
+                except RecursionError:
+                    result = None
+                results[scenario][mode] = result
+                print(format_row(scenario, mode, result), flush=True)
+        finally:
+            if tree_dir is None:
+                remove_tree(root)
+    return results
+
+
+def format_row(scenario: str, mode: str, result: dict, baseline: dict = None) -> str:
+    """Format one measurement, with its ratio to a baseline measurement if given."""
+    if result is None:
+        return f"{scenario:>8} {mode:>12} {'RecursionError':>48}"
+    row = (
+        f"{scenario:>8} {mode:>12} {result['seconds'] * 1e3:>9.1f} ms "
+        f"{result['calls']:>8,} calls {result['peak'] / 1024:>8.0f} KiB "
+        f"{result['files']:>9,} files"
+    )
+    if baseline is not None:
+        row += (
+            f" {result['seconds'] / baseline['seconds']:>6.2f}x time"
+            f" {result['calls'] - baseline['calls']:>+8,} calls"
+            f" {result['peak'] / max(baseline['peak'], 1):>6.2f}x peak"
+        )
+    return row
+
+
+def report(results: dict, baseline: dict = None) -> None:
+    """
+    Print every measurement against a baseline.
+
+    Each mode is compared with the same scenario and mode in baseline, the
+    results of an earlier run, or without one with the recursive mode of the
+    same run.
+    """
+    print()
+    if baseline is None:
+        print(f"Compared with the {BASELINE_MODE} mode")
+    else:
+        print("Compared with the baseline run")
+    for scenario, modes in results.items():
+        for mode, result in modes.items():
+            if baseline is None:
+                reference = modes.get(BASELINE_MODE)
+            else:
+                reference = baseline.get(scenario, {}).get(mode)
+            if result is not None and result is not reference:
+                print(format_row(scenario, mode, result, reference))
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=SCENARIOS, default=DEFAULT_SCENARIOS
+    )
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tree-dir", help="keep generated trees here between runs")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with results saved by --save")
+    args = parser.parse_args(argv)
+
+    if args.tree_dir is not None:
+        os.makedirs(args.tree_dir, exist_ok=True)
+    print(f"Python {platform.python_version()} on {platform.platform()}")
+    results = run_suite(args.scenarios, args.modes, args.repeat, args.tree_dir)
+
+    baseline = None
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+    report(results, baseline)
+
+    if args.save is not None:
+        with open(args.save, "w") as file:
+            json.dump(
+                {"python": platform.python_version(), "results": results},
+                file,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,165 @@
-from collections import OrderedDict
+import asyncio
+import functools
+import itertools
+import multiprocessing
+import os
+import pickle
+import struct
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future
+from multiprocessing import resource_tracker, shared_memory
+
+try:
+    import fcntl
+except ImportError:  # Not on Windows
+    fcntl = None
+
+# Miss marker for internal lookups, since -1 can be a cached value
+_MISSING = object()
+
+_INT64_MIN = -(1 << 63)
+_INT64_MAX = (1 << 63) - 1
 
 
 class LRU_Cache(object):
-    def __init__(self, capacity: int):
+    # Number of entries with a TTL that each set() checks for expiry
+    sweep_batch = 4
+
+    def __init__(
+        self,
+        capacity: int,
+        max_weight: int = None,
+        sizeof=None,
+        ttl: float = None,
+        clock=None,
+        policy="lru",
+        stats: bool = False,
+        on_evict=None,
+    ):
         """
         Initialise the LRU Cache.
+
+        Passing max_weight switches the cache to weighted mode: every entry has
+        a weight (for example its size in bytes) and least recently used entries
+        are evicted until the total weight fits max_weight as well as capacity.
+
+        Entries can also be given a time to live, either per entry in set() or
+        for every entry through ttl. Expired entries are dropped when get() finds
+        them, and every set() checks a small batch of entries so that expired
+        entries that are never read again do not hold on to capacity.
+
+        The entry to evict is chosen by the eviction policy. The default "lru"
+        evicts the least recently used entry; "tinylfu" selects WTinyLFUPolicy,
+        which keeps frequently used entries through scans of cold keys. Any
+        EvictionPolicy instance can be passed as well.
+
+        Statistics are opt-in: with stats=True the cache counts hits, misses,
+        inserts and updates and samples operation latencies into a CacheStats.
+        The counting versions of the methods are only installed on caches that
+        ask for them, so a cache without stats runs exactly the same code.
+
         Attributes:
         capacity (int): The maximum number of key-value pairs the cache can hold.
         cache (OrderedDict): A dictionary that stores the cache entries and their access order.
+        max_weight (int): The maximum total weight of the entries, or None to only count entries.
+        sizeof (callable): Computes the weight of a value when set() is not given one.
+            Defaults to sys.getsizeof.
+        weights (dict): The weight of each entry, only filled in weighted mode.
+        current_weight (int): The total weight of the entries in the cache.
+        evictions (int): The number of entries evicted to make room for new ones.
+        ttl (float): The default time to live of an entry in seconds, or None for no expiry.
+        clock (callable): Returns the current time in seconds. Defaults to time.monotonic.
+        expires (OrderedDict): The expiry time of each entry that has a time to live.
+        expirations (int): The number of entries dropped because they expired.
+        loads (dict): The Future of every get_or_load() call that is running its loader.
+        async_loads (dict): The asyncio.Future of every get_or_load_async() call
+            that is awaiting its loader.
+        policy (EvictionPolicy): The eviction policy, or None for the built-in LRU order.
+        stats (CacheStats): The statistics of the cache, or None when they are disabled.
+        on_evict (callable): Called with the key and value of every evicted entry.
+
+        Raises:
+            ValueError: If policy is not a known policy name.
         """
         self.capacity = capacity
         self.cache = OrderedDict()
+        self.max_weight = max_weight
+        self.sizeof = sizeof if sizeof is not None else sys.getsizeof
+        self.weights = {}
+        self.current_weight = 0
+        self.evictions = 0
+        self.ttl = ttl
+        self.clock = clock if clock is not None else time.monotonic
+        self.expires = OrderedDict()
+        self.expirations = 0
+        self.loads = {}
+        self.loads_lock = threading.Lock()
+        self.async_loads = {}
+        if isinstance(policy, str):
+            if policy == "lru":
+                policy = None
+            elif policy in POLICIES:
+                policy = POLICIES[policy](capacity)
+            else:
+                raise ValueError(f"unknown eviction policy {policy!r}")
+        self.policy = policy
+        self.on_evict = on_evict
+        self.stats = None
+        if stats:
+            self.stats = CacheStats(self)
+            self.stats.install()
 
     def get_capacity(self):
         return self.capacity
 
-    def get(self, key: int) -> int:
+    def get_weight(self):
+        return self.current_weight
+
+    def get_evictions(self):
+        return self.evictions
+
+    def get_expirations(self):
+        return self.expirations
+
+    def get(self, key: int, default=-1) -> int:
         """
         Retrieve an item from the cache by it key.
 
         If the key exists, it is moved to the end to indicate recent use,
         and its value is returned. If the key doesn't exist, -1 is returned.
+        An expired entry is removed and treated as missing.
 
         Args:
             key (int): The key of the item to retrieve.
+            default (optional): The value returned on a miss. Defaults to -1.
 
         Returns:
-            int: The value associated with the key if it exists, else -1.
+            int: The value associated with the key if it exists, else default.
 
         Time Complexity:
             O(1) on average. OrderedDict provides constant-time complexity
             for get operations and moving elements.
         """
         if key in self.cache:
-            self.cache.move_to_end(key)
-            return self.cache[key]
-        else:
-            return -1
+            if key in self.expires and self.expires[key] <= self.clock():
+                self._remove(key)
+                self.expirations += 1
+            else:
+                if self.policy is None:
+                    self.cache.move_to_end(key)
+                else:
+                    self.policy.access(key)
+                return self.cache[key]
+        if self.policy is not None:
+            self.policy.miss(key)
+        return default
 
-    def set(self, key: int, value: int) -> None:
+    def set(self, key: int, value: int, weight: int = None, ttl: float = None) -> None:
         """
         Add or update a key-value pair in the cache.
 
@@ -46,19 +167,1495 @@ class LRU_Cache(object):
         to indicate recent use. If the cache is at capacity and a new key is added,
         the least recently used item is removed before insertion.
 
+        In weighted mode the entry is inserted first, then least recently used
+        entries are removed until both the entry count and the total weight fit.
+
+        Before inserting, up to sweep_batch entries with a time to live are
+        checked and removed if they have expired.
+
         Args:
             key (int): The key of the item to add or update
             value (int): The value to associate with the key
+            weight (int, optional): The weight of the entry in weighted mode.
+                Computed with sizeof(value) when not given.
+            ttl (float, optional): The time to live of the entry in seconds.
+                Defaults to the ttl of the cache.
+
+        Raises:
+            ValueError: If the weight of the entry alone is more than max_weight.
 
         Time Complexity:
             O(1) on average. OrderedDict provides constant-time complexity for
-            inserting, updating, and moving elements.
+            inserting, updating, and moving elements. In weighted mode each set
+            can evict several entries, but every entry is evicted at most once,
+            so the cost is O(1) amortised. The expiry sweep checks a fixed
+            number of entries, so it adds O(1) to every set.
         """
+        if ttl is None:
+            ttl = self.ttl
+        if self.expires:
+            self._sweep()
+
+        if self.max_weight is not None:
+            self._set_weighted(key, value, weight)
+        elif self.policy is not None:
+            self._set_with_policy(key, value)
+        else:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+            elif len(self.cache) >= self.capacity:
+                self._evict()
+            self.cache[key] = value
+
+        if key not in self.cache:
+            # The eviction policy turned the new entry away
+            return
+        if ttl is not None:
+            self.expires[key] = self.clock() + ttl
+            self.expires.move_to_end(key)
+        elif self.expires:
+            self.expires.pop(key, None)
+
+    def get_many(self, keys) -> dict:
+        """
+        Retrieve several items from the cache at once.
+
+        Every key found is moved to the end in the order given, exactly as if
+        get() had been called on each key in turn.
+
+        Args:
+            keys (iterable): The keys of the items to retrieve.
+
+        Returns:
+            dict: The value of every key that is in the cache. Missing keys are left out.
+
+        Time Complexity:
+            O(k) on average, where k is the number of keys.
+        """
+        found = {}
+        if self.expires or self.policy is not None:
+            for key in keys:
+                value = type(self).get(self, key, _MISSING)
+                if value is not _MISSING:
+                    found[key] = value
+            return found
+
+        # Nothing can expire and the order is plain LRU, so skip the per-key checks
+        cache = self.cache
+        move_to_end = cache.move_to_end
+        for key in keys:
+            if key in cache:
+                move_to_end(key)
+                found[key] = cache[key]
+        return found
+
+    def set_many(self, mapping: dict, ttl: float = None) -> None:
+        """
+        Add or update several key-value pairs in the cache at once.
+
+        The entries are inserted in the order of the mapping, then entries are
+        evicted once for the whole batch. This leaves the cache as a loop of
+        set() calls would, apart from weights, which are computed with sizeof.
+
+        Args:
+            mapping (dict): The key-value pairs to add or update.
+            ttl (float, optional): The time to live of the entries in seconds.
+                Defaults to the ttl of the cache.
+
+        Time Complexity:
+            O(k) on average, where k is the number of entries in the mapping.
+        """
+        if (
+            ttl is not None
+            or self.ttl is not None
+            or self.expires
+            or self.max_weight is not None
+            or self.policy is not None
+        ):
+            for key, value in mapping.items():
+                type(self).set(self, key, value, ttl=ttl)
+            return
+
+        cache = self.cache
+        move_to_end = cache.move_to_end
+        for key, value in mapping.items():
+            cache[key] = value
+            move_to_end(key)
+        while len(cache) > self.capacity:
+            self._evict()
+
+    def clear(self) -> None:
+        """
+        Remove every entry from the cache.
+
+        Counters such as evictions are kept.
+
+        Time Complexity: O(n), where n is the number of entries.
+        """
+        if self.policy is not None:
+            for key in self.cache:
+                self.policy.remove(key)
+        self.cache.clear()
+        self.weights.clear()
+        self.current_weight = 0
+        self.expires.clear()
+
+    # Snapshot file layout: magic, then chunks of a tag byte, a uint32 and a payload
+    _DUMP_MAGIC = b"LRUDUMP1"
+    _DUMP_CHUNK = 4096
+    _DUMP_HEADER = struct.Struct("<cI")
+
+    def dump(self, path: str) -> None:
+        """
+        Write the entries of the cache to a file, from least to most recently used.
+
+        The entries are streamed in chunks of _DUMP_CHUNK entries, so only one
+        chunk is copied at a time. A chunk where every key and value is an int
+        is written as raw little-endian int64 pairs (tag b"I", the uint32 is
+        the number of pairs). Any other chunk is pickled as (key, value,
+        weight, ttl) tuples (tag b"P", the uint32 is the payload size), where
+        ttl is the time the entry has left to live. Entries that have already
+        expired are skipped.
+
+        With an eviction policy, the entries are written in the order they
+        were first set, as the policy keeps the recency of its own segments.
+
+        Args:
+            path (str): The file to write.
+
+        Time Complexity: O(n), where n is the number of entries.
+        """
+        plain = self.max_weight is None and not self.expires
+        now = self.clock() if self.expires else None
+        entries = iter(self.cache.items())
+        with open(path, "wb") as file:
+            file.write(self._DUMP_MAGIC)
+            while True:
+                chunk = list(itertools.islice(entries, self._DUMP_CHUNK))
+                if not chunk:
+                    break
+                if plain:
+                    flat = list(itertools.chain.from_iterable(chunk))
+                    if {type(item) for item in flat} == {int}:
+                        try:
+                            pairs = array("q", flat)
+                        except OverflowError:
+                            pass
+                        else:
+                            if sys.byteorder == "big":
+                                pairs.byteswap()
+                            file.write(self._DUMP_HEADER.pack(b"I", len(chunk)))
+                            pairs.tofile(file)
+                            continue
+                records = []
+                for key, value in chunk:
+                    ttl = None
+                    if key in self.expires:
+                        ttl = self.expires[key] - now
+                        if ttl <= 0:
+                            continue
+                    records.append((key, value, self.weights.get(key), ttl))
+                payload = pickle.dumps(records, protocol=pickle.HIGHEST_PROTOCOL)
+                file.write(self._DUMP_HEADER.pack(b"P", len(payload)))
+                file.write(payload)
+
+    def load(self, path: str) -> None:
+        """
+        Replace the entries of the cache with the entries of a file written by dump().
+
+        Entries are inserted from least to most recently used, so the cache
+        ends up in the same order it was dumped in. If the file holds more
+        entries than the cache has room for, the least recently used ones are
+        evicted as usual. Entries keep their weight and the time they had
+        left to live. With an eviction policy, every entry is inserted as a
+        new one, so the policy's segments and frequency counts start afresh.
+        The file is unpickled, so only load files you trust.
+
+        Args:
+            path (str): The file to read.
+
+        Raises:
+            ValueError: If the file was not written by dump().
+
+        Time Complexity: O(n), where n is the number of entries in the file.
+        """
+        with open(path, "rb") as file:
+            if file.read(len(self._DUMP_MAGIC)) != self._DUMP_MAGIC:
+                raise ValueError(f"{path} is not an LRU_Cache snapshot")
+            self.clear()
+            while True:
+                header = file.read(self._DUMP_HEADER.size)
+                if not header:
+                    break
+                tag, size = self._DUMP_HEADER.unpack(header)
+                if tag == b"I":
+                    pairs = array("q")
+                    pairs.fromfile(file, 2 * size)
+                    if sys.byteorder == "big":
+                        pairs.byteswap()
+                    self.set_many(dict(zip(pairs[::2], pairs[1::2])))
+                elif tag == b"P":
+                    for key, value, weight, ttl in pickle.loads(file.read(size)):
+                        self.set(key, value, weight=weight, ttl=ttl)
+                else:
+                    raise ValueError(f"{path} has an unknown chunk {tag!r}")
+
+    def delete(self, key: int) -> bool:
+        """
+        Remove an item from the cache.
+
+        Args:
+            key (int): The key of the item to remove.
+
+        Returns:
+            bool: True if the key was in the cache, else False.
+
+        Time Complexity: O(1) on average
+        """
+        return self.pop(key, _MISSING) is not _MISSING
+
+    def pop(self, key: int, default=-1):
+        """
+        Remove an item from the cache and return its value.
+
+        An expired entry is removed as well but treated as missing.
+
+        Args:
+            key (int): The key of the item to remove.
+            default (optional): The value returned on a miss. Defaults to -1.
+
+        Returns:
+            The value associated with the key if it exists, else default.
+
+        Time Complexity: O(1) on average
+        """
+        if key not in self.cache:
+            return default
+        value = self.cache[key]
+        expired = key in self.expires and self.expires[key] <= self.clock()
+        self._remove(key)
+        if expired:
+            self.expirations += 1
+            return default
+        return value
+
+    def get_or_load(self, key: int, loader):
+        """
+        Retrieve an item from the cache, calling loader(key) to fill it on a miss.
+
+        Only one loader runs per key at a time: threads that miss on a key that
+        is already being loaded wait for that load and share its result instead
+        of calling their own loader. If the loader raises, the exception is
+        raised in every waiting thread and nothing is cached, so the next call
+        tries again.
+
+        Args:
+            key (int): The key of the item to retrieve.
+            loader (callable): Called with the key to compute a missing value.
+
+        Returns:
+            The cached or loaded value.
+
+        Time Complexity:
+            O(1) on average on a hit. On a miss, the time of one loader call.
+        """
+        with self.loads_lock:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+            load = self.loads.get(key)
+            leader = load is None
+            if leader:
+                load = self.loads[key] = Future()
+
+        if not leader:
+            return load.result()
+
+        try:
+            value = loader(key)
+        except BaseException as exc:
+            with self.loads_lock:
+                del self.loads[key]
+            load.set_exception(exc)
+            raise
+        with self.loads_lock:
+            self.set(key, value)
+            del self.loads[key]
+        load.set_result(value)
+        return value
+
+    async def get_or_load_async(self, key: int, loader):
+        """
+        Retrieve an item from the cache, awaiting loader(key) to fill it on a miss.
+
+        The asyncio counterpart of get_or_load(): tasks that miss on a key that
+        is already being loaded await that load instead of starting their own.
+        Cancelling a waiting task does not cancel the shared load, but if the
+        task running the loader is cancelled, the waiting tasks are cancelled too.
+
+        Args:
+            key (int): The key of the item to retrieve.
+            loader (callable): Called with the key, returns an awaitable of the value.
+
+        Returns:
+            The cached or loaded value.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        load = self.async_loads.get(key)
+        if load is not None:
+            return await asyncio.shield(load)
+
+        load = self.async_loads[key] = asyncio.get_running_loop().create_future()
+        try:
+            value = await loader(key)
+        except asyncio.CancelledError:
+            del self.async_loads[key]
+            load.cancel()
+            raise
+        except BaseException as exc:
+            del self.async_loads[key]
+            load.set_exception(exc)
+            # Mark the exception as retrieved in case nobody was waiting
+            load.exception()
+            raise
+        self.set(key, value)
+        del self.async_loads[key]
+        load.set_result(value)
+        return value
+
+    def _set_weighted(self, key, value, weight) -> None:
+        if weight is None:
+            weight = self.sizeof(value)
+        if weight > self.max_weight:
+            raise ValueError(
+                f"weight {weight} is more than the cache max_weight {self.max_weight}"
+            )
+        if key in self.cache:
+            self.current_weight -= self.weights[key]
+            if self.policy is None:
+                self.cache.move_to_end(key)
+            else:
+                self.policy.access(key)
+        elif self.policy is not None:
+            self.policy.insert(key)
+        self.cache[key] = value
+        self.weights[key] = weight
+        self.current_weight += weight
+
+        # The entry fits on its own, so others are evicted until it fits
+        while len(self.cache) > self.capacity or self.current_weight > self.max_weight:
+            self._evict(spare=key)
+
+    def _set_with_policy(self, key, value) -> None:
+        # The policy may prefer to evict the new entry, so insert it first
         if key in self.cache:
-            self.cache.move_to_end(key)
-        elif len(self.cache) >= self.capacity:
-            self.cache.popitem(last=False)
+            self.policy.access(key)
+        else:
+            self.policy.insert(key)
         self.cache[key] = value
+        while len(self.cache) > self.capacity:
+            self._evict()
+
+    def _evict(self, spare=_MISSING) -> None:
+        # Remove the least recently used entry, or the policy's choice, to make room
+        if self.policy is None:
+            evicted, value = self.cache.popitem(last=False)
+        else:
+            evicted = self.policy.evict()
+            if evicted == spare:
+                # Evict another entry instead, and give the spared one back
+                evicted = self.policy.evict()
+                self.policy.insert(spare)
+            value = self.cache.pop(evicted)
+        if self.max_weight is not None:
+            self.current_weight -= self.weights.pop(evicted)
+        if self.expires:
+            self.expires.pop(evicted, None)
+        self.evictions += 1
+        if self.on_evict is not None:
+            self.on_evict(evicted, value)
+
+    def _remove(self, key) -> None:
+        del self.cache[key]
+        if self.policy is not None:
+            self.policy.remove(key)
+        if self.max_weight is not None:
+            self.current_weight -= self.weights.pop(key)
+        self.expires.pop(key, None)
+
+    def _sweep(self) -> None:
+        """
+        Check up to sweep_batch entries with a time to live and remove the expired ones.
+
+        The entries are checked from the front of expires, and entries that are
+        still alive are rotated to the back, so repeated sweeps cycle through all
+        of them instead of checking the same entries again.
+
+        Time Complexity:
+            O(1), at most sweep_batch entries are checked.
+        """
+        now = self.clock()
+        expires = self.expires
+        for _ in range(min(self.sweep_batch, len(expires))):
+            key, expiry = next(iter(expires.items()))
+            if expiry <= now:
+                self._remove(key)
+                self.expirations += 1
+            else:
+                expires.move_to_end(key)
+
+
+class ShardedLRUCache(object):
+    def __init__(self, capacity: int, shards: int = 8):
+        """
+        Initialise a thread-safe LRU Cache split across independently locked shards.
+
+        Keys are hashed onto one of the shards, and each shard is a plain
+        LRU_Cache guarded by its own lock, so threads working on different
+        shards never wait on each other. The capacity is split across the
+        shards, so eviction is least recently used per shard rather than
+        across the whole cache.
+
+        Attributes:
+        capacity (int): The maximum number of key-value pairs the cache can hold.
+        shards (list[LRU_Cache]): The shards holding the cache entries.
+        locks (list[threading.Lock]): One lock per shard.
+
+        Raises:
+            ValueError: If capacity or shards is less than 1.
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        if shards < 1:
+            raise ValueError("shards must be at least 1")
+        # Never create more shards than entries, every shard must hold one
+        shards = min(shards, capacity)
+        base, extra = divmod(capacity, shards)
+        self.capacity = capacity
+        self.shards = [LRU_Cache(base + (i < extra)) for i in range(shards)]
+        self.locks = [threading.Lock() for _ in range(shards)]
+
+    def get_capacity(self):
+        return self.capacity
+
+    def _shard_index(self, key) -> int:
+        return hash(key) % len(self.shards)
+
+    def get(self, key: int) -> int:
+        """
+        Retrieve an item from the cache by its key.
+
+        Args:
+            key (int): The key of the item to retrieve.
+
+        Returns:
+            int: The value associated with the key if it exists, else -1.
+
+        Time Complexity:
+            O(1) on average, plus the time spent waiting for the shard lock.
+        """
+        index = self._shard_index(key)
+        with self.locks[index]:
+            return self.shards[index].get(key)
+
+    def set(self, key: int, value: int) -> None:
+        """
+        Add or update a key-value pair in the shard the key hashes to.
+
+        Args:
+            key (int): The key of the item to add or update
+            value (int): The value to associate with the key
+
+        Time Complexity:
+            O(1) on average, plus the time spent waiting for the shard lock.
+        """
+        index = self._shard_index(key)
+        with self.locks[index]:
+            self.shards[index].set(key, value)
+
+
+class CacheStats(object):
+    def __init__(self, cache: LRU_Cache, sample_every: int = 64):
+        """
+        Initialise the statistics of an LRU Cache.
+
+        Every operation is counted, but only one in sample_every operations is
+        timed. Latencies go into histograms with power-of-two buckets, so
+        recording one is a single list increment.
+
+        Attributes:
+        cache (LRU_Cache): The cache the statistics belong to.
+        sample_every (int): Time one in this many operations.
+        hits (int): get() calls that found their key, including keys found by get_many().
+        misses (int): get() calls that did not find their key.
+        inserts (int): set() calls that added a new key.
+        updates (int): set() calls that replaced the value of an existing key.
+        operations (int): The number of operations counted, used for sampling.
+        latencies (dict): For each operation name, a list where index i counts
+            samples that took less than 2**i nanoseconds.
+        """
+        self.cache = cache
+        self.sample_every = sample_every
+        self.reset()
+
+    def reset(self) -> None:
+        """Set every counter and histogram back to zero."""
+        self.hits = 0
+        self.misses = 0
+        self.inserts = 0
+        self.updates = 0
+        self.operations = 0
+        self.evictions_at_reset = self.cache.evictions
+        self.expirations_at_reset = self.cache.expirations
+        self.latencies = {name: [0] * 64 for name in ("get", "set")}
+
+    def record_latency(self, name: str, nanoseconds: int) -> None:
+        self.latencies[name][min(nanoseconds.bit_length(), 63)] += 1
+
+    def snapshot(self) -> dict:
+        """
+        Return the current statistics as a plain dictionary.
+
+        The latency histograms only list the buckets that have samples, keyed
+        by the bucket upper bound in nanoseconds.
+
+        Time Complexity: O(1)
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "inserts": self.inserts,
+            "updates": self.updates,
+            "evictions": self.cache.evictions - self.evictions_at_reset,
+            "expirations": self.cache.expirations - self.expirations_at_reset,
+            "size": len(self.cache.cache),
+            "weight": self.cache.current_weight,
+            "latency_ns": {
+                name: {1 << i: count for i, count in enumerate(buckets) if count}
+                for name, buckets in self.latencies.items()
+            },
+        }
+
+    def install(self) -> None:
+        """
+        Replace get, set, get_many and set_many on the cache instance with counting versions.
+
+        The counting versions call the class methods, so caches without stats
+        never pay for the counting.
+        """
+        cache = self.cache
+        cls = type(cache)
+        get, set_, get_many, set_many = cls.get, cls.set, cls.get_many, cls.set_many
+        perf_counter_ns = time.perf_counter_ns
+
+        def counting_get(key, default=-1):
+            self.operations += 1
+            if self.operations % self.sample_every:
+                value = get(cache, key, _MISSING)
+            else:
+                start = perf_counter_ns()
+                value = get(cache, key, _MISSING)
+                self.record_latency("get", perf_counter_ns() - start)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+        def counting_set(key, value, weight=None, ttl=None):
+            self.operations += 1
+            if key in cache.cache:
+                self.updates += 1
+            else:
+                self.inserts += 1
+            if self.operations % self.sample_every:
+                set_(cache, key, value, weight, ttl)
+            else:
+                start = perf_counter_ns()
+                set_(cache, key, value, weight, ttl)
+                self.record_latency("set", perf_counter_ns() - start)
+
+        def counting_get_many(keys):
+            keys = list(keys)
+            self.operations += len(keys)
+            found = get_many(cache, keys)
+            # Per key, so a repeated key counts once for each time it is given
+            hits = sum(key in found for key in keys)
+            self.hits += hits
+            self.misses += len(keys) - hits
+            return found
+
+        def counting_set_many(mapping, ttl=None):
+            self.operations += len(mapping)
+            updates = sum(1 for key in mapping if key in cache.cache)
+            self.updates += updates
+            self.inserts += len(mapping) - updates
+            set_many(cache, mapping, ttl)
+
+        cache.get = counting_get
+        cache.set = counting_set
+        cache.get_many = counting_get_many
+        cache.set_many = counting_set_many
+
+
+class FrequencySketch(object):
+    # Odd 64-bit multipliers, one per row of the sketch
+    seeds = (
+        0x9E3779B97F4A7C15,
+        0xC2B2AE3D27D4EB4F,
+        0x165667B19E3779F9,
+        0xD6E8FEB86659FD93,
+    )
+    # Counters stop at 15, like the 4-bit counters of the TinyLFU paper
+    max_count = 15
+
+    def __init__(self, capacity: int):
+        """
+        Initialise a count-min sketch that estimates how often keys were seen.
+
+        The sketch is a fixed bytearray with one row of counters per seed, so it
+        takes a few bytes per cache entry however many distinct keys go through
+        it. Once 10 increments per counter column have been recorded, every
+        counter is halved so the estimates follow recent popularity.
+
+        Attributes:
+        width (int): The number of counters per row, a power of two >= capacity.
+        table (bytearray): The counters, one row after another.
+        additions (int): The increments recorded since the last halving.
+        sample_size (int): The number of increments between halvings.
+        """
+        bits = max(4, (max(capacity, 1) - 1).bit_length())
+        self.width = 1 << bits
+        self.shift = 64 - bits
+        self.table = bytearray(self.width * len(self.seeds))
+        self.additions = 0
+        self.sample_size = 10 * self.width
+
+    def _indexes(self, key):
+        h = hash(key)
+        width = self.width
+        shift = self.shift
+        return [
+            row * width + (((h * seed) & 0xFFFFFFFFFFFFFFFF) >> shift)
+            for row, seed in enumerate(self.seeds)
+        ]
+
+    def increment(self, key) -> None:
+        """
+        Record one occurrence of key.
+
+        Time Complexity: O(1) amortised, halving the table every sample_size
+        increments costs O(width).
+        """
+        table = self.table
+        for index in self._indexes(key):
+            if table[index] < self.max_count:
+                table[index] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self.table = table.translate(_HALVE)
+            self.additions //= 2
+
+    def frequency(self, key) -> int:
+        """
+        Estimate how often key was seen, never underestimating (up to max_count).
+
+        Time Complexity: O(1)
+        """
+        table = self.table
+        return min(table[index] for index in self._indexes(key))
+
+
+# Lookup table that halves every byte with bytearray.translate
+_HALVE = bytes(i >> 1 for i in range(256))
+
+
+class EvictionPolicy(object):
+    """
+    Decides which entry LRU_Cache evicts when it is over capacity.
+
+    The cache stores the values; a policy only tracks keys. The cache tells the
+    policy about every access, miss, insertion and removal, and calls evict()
+    whenever it needs to free an entry.
+    """
+
+    def access(self, key) -> None:
+        """Called when an entry in the cache is read or updated."""
+        raise NotImplementedError
+
+    def miss(self, key) -> None:
+        """Called when a key is looked up but is not in the cache."""
+        raise NotImplementedError
+
+    def insert(self, key) -> None:
+        """Called when a new entry is added to the cache."""
+        raise NotImplementedError
+
+    def remove(self, key) -> None:
+        """Called when an entry leaves the cache other than through evict()."""
+        raise NotImplementedError
+
+    def evict(self):
+        """Forget one entry and return its key so the cache can drop it."""
+        raise NotImplementedError
+
+
+class WTinyLFUPolicy(EvictionPolicy):
+    def __init__(self, capacity: int, window_ratio: float = 0.01, protected_ratio=0.8):
+        """
+        Initialise a Window TinyLFU eviction policy.
+
+        New entries go into a small LRU window. Entries pushed out of the window
+        become candidates for the main space, which is a segmented LRU of a
+        probation and a protected segment. When the cache is full, a candidate
+        only replaces the oldest probation entry if the frequency sketch says it
+        was seen more often, so a one-off scan of cold keys cannot flush the
+        popular entries out of the cache.
+
+        Args:
+            capacity (int): The capacity of the cache using the policy.
+            window_ratio (float): The share of the capacity used by the window.
+            protected_ratio (float): The share of the main space used by the
+                protected segment.
+
+        Attributes:
+        window (OrderedDict): Recently added keys in LRU order.
+        probation (OrderedDict): Keys in the main space seen once since admission.
+        protected (OrderedDict): Keys in the main space read again after admission.
+        sketch (FrequencySketch): Estimates how often each key was requested.
+        """
+        self.window_max = max(1, int(capacity * window_ratio))
+        self.protected_max = int(max(capacity - self.window_max, 0) * protected_ratio)
+        self.window = OrderedDict()
+        self.probation = OrderedDict()
+        self.protected = OrderedDict()
+        self.sketch = FrequencySketch(capacity)
+
+    def access(self, key) -> None:
+        self.sketch.increment(key)
+        if key in self.window:
+            self.window.move_to_end(key)
+        elif key in self.probation:
+            del self.probation[key]
+            self.protected[key] = None
+            if len(self.protected) > self.protected_max:
+                demoted, _ = self.protected.popitem(last=False)
+                self.probation[demoted] = None
+        else:
+            self.protected.move_to_end(key)
+
+    def miss(self, key) -> None:
+        self.sketch.increment(key)
+
+    def insert(self, key) -> None:
+        self.sketch.increment(key)
+        self.window[key] = None
+
+    def remove(self, key) -> None:
+        for segment in (self.window, self.probation, self.protected):
+            if key in segment:
+                del segment[key]
+                return
+
+    def evict(self):
+        """
+        Pick the entry to evict.
+
+        Keys pushed out of the window join the probation segment. If that gives
+        a candidate, it is compared with the oldest probation key, and the one
+        the sketch has seen less often is evicted, the candidate losing ties.
+
+        Time Complexity: O(1) amortised
+        """
+        candidate = None
+        while len(self.window) > self.window_max:
+            candidate, _ = self.window.popitem(last=False)
+            self.probation[candidate] = None
+
+        if self.probation:
+            main = self.probation
+        elif self.protected:
+            main = self.protected
+        else:
+            return self.window.popitem(last=False)[0]
+
+        victim = next(iter(main))
+        if (
+            candidate is not None
+            and candidate != victim
+            and self.sketch.frequency(candidate) <= self.sketch.frequency(victim)
+        ):
+            del self.probation[candidate]
+            return candidate
+        del main[victim]
+        return victim
+
+
+# Eviction policies LRU_Cache can select by name, besides the built-in "lru"
+POLICIES = {"tinylfu": WTinyLFUPolicy}
+
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+# Keys of single arguments of these types can be used as they are
+_FAST_KEY_TYPES = {int, str}
+
+
+def _make_key(args: tuple, kwargs: dict, typed: bool):
+    """
+    Build a cache key from the arguments of a call.
+
+    A single int or str argument is its own key, which saves building and
+    hashing a tuple for the most common calls. Otherwise the key is a flat
+    tuple of the positional arguments, a marker, and the keyword items.
+    With typed, the argument types are added so that f(1) and f(1.0) are
+    cached separately.
+
+    Time Complexity: O(a), where a is the number of arguments.
+    """
+    if not kwargs and not typed and len(args) == 1 and type(args[0]) in _FAST_KEY_TYPES:
+        return args[0]
+    key = args
+    if kwargs:
+        key += (_MISSING,)
+        for item in kwargs.items():
+            key += item
+    if typed:
+        key += tuple(type(arg) for arg in args)
+        if kwargs:
+            key += tuple(type(value) for value in kwargs.values())
+    return key
+
+
+def lru_memoize(capacity: int = 128, typed: bool = False, **cache_options):
+    """
+    Decorator that caches the results of a function in an LRU_Cache.
+
+    Works like functools.lru_cache, but the cache is an LRU_Cache, so options
+    such as max_weight, ttl, policy and stats can be passed through. Results
+    equal to -1 are cached like any other value.
+
+    Args:
+        capacity (int): The maximum number of results to keep.
+        typed (bool): Cache arguments of different types separately.
+        **cache_options: Further keyword arguments for LRU_Cache.
+
+    Returns:
+        A decorator. The decorated function has cache_info(), cache_clear()
+        and the underlying cache as the cache attribute.
+
+    Example:
+        @lru_memoize(capacity=256, ttl=60)
+        def lookup(user_id): ...
+    """
+
+    def decorator(func):
+        cache = LRU_Cache(capacity, **cache_options)
+        hits = misses = 0
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            nonlocal hits, misses
+            key = _make_key(args, kwargs, typed)
+            result = cache.get(key, _MISSING)
+            if result is not _MISSING:
+                hits += 1
+                return result
+            misses += 1
+            result = func(*args, **kwargs)
+            cache.set(key, result)
+            return result
+
+        def cache_info() -> CacheInfo:
+            return CacheInfo(hits, misses, capacity, len(cache.cache))
+
+        def cache_clear() -> None:
+            nonlocal hits, misses
+            cache.clear()
+            hits = misses = 0
+
+        wrapper.cache = cache
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
+        return wrapper
+
+    return decorator
+
+
+class _NamedLock(object):
+    """
+    A lock any process can open by name, an exclusive flock on a lock file.
+
+    flock only excludes other open files of the lock file, so the threads of
+    one process also share a threading.Lock, and a forked child opens the
+    file again instead of using the descriptor it inherited.
+    """
+
+    def __init__(self, name: str):
+        self.path = os.path.join(tempfile.gettempdir(), f"{name}.lock")
+        self._open()
+
+    def _open(self) -> None:
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        self.pid = os.getpid()
+        self.thread_lock = threading.Lock()
+
+    def __enter__(self):
+        if self.pid != os.getpid():
+            self._open()
+        self.thread_lock.acquire()
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        fcntl.flock(self.fd, fcntl.LOCK_UN)
+        self.thread_lock.release()
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+    def unlink(self) -> None:
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class SharedLRUCache(object):
+    # Header words: magic, capacity, value_size, buckets, head, tail, free, count,
+    # and whether the cache uses a named lock
+    _MAGIC = 0x3130555243534C52
+    _HEADER_WORDS = 9
+    _CAPACITY, _VALUE_SIZE, _BUCKETS, _HEAD, _TAIL, _FREE, _COUNT, _NAMED = range(1, 9)
+    # Slot words: key, prev, next, chain, length, then the value
+    _KEY, _PREV, _NEXT, _CHAIN, _LENGTH = range(5)
+    _SLOT_HEADER_WORDS = 5
+    # Stored in the length word of a slot holding an int value
+    _INT_VALUE = -1
+    # The names of the blocks created by this process
+    _created = set()
+
+    def __init__(
+        self,
+        capacity: int,
+        value_size: int = 64,
+        name: str = None,
+        lock=None,
+        named_lock: bool = False,
+    ):
+        """
+        Initialise an LRU Cache that lives in shared memory.
+
+        Every process that attaches to the cache sees the same entries, so a
+        pool of worker processes keeps one copy of the hot data. Keys are ints
+        and values are ints or bytes of at most value_size bytes.
+
+        Everything is stored in one buffer of int64 words: a header, a table of
+        hash buckets, and a fixed table of capacity slots. Each slot holds its
+        key, the previous and next slot in recency order, the next slot in its
+        hash bucket, and its value. Unused slots are kept on a free list, so
+        the cache never allocates after it is created.
+
+        The cache is created before forking the workers, which inherit it and
+        its lock, or it is handed to processes the creator starts. Any other
+        process can only join with SharedLRUCache.attach() if the cache was
+        created with named_lock, since a multiprocessing lock cannot be given
+        to an unrelated process. The named lock is a lock file that any
+        process can open, at the cost of two flock calls per operation.
+
+        Args:
+            capacity (int): The maximum number of key-value pairs the cache can hold.
+            value_size (int): The maximum size in bytes of a bytes value.
+            name (str, optional): The name of the shared memory block. A unique
+                name is generated when not given.
+            lock (optional): A multiprocessing lock shared by every process.
+                A new multiprocessing.Lock is created when not given.
+            named_lock (bool): Lock with a file named after the block instead,
+                which needs the fcntl module.
+
+        Attributes:
+        shm (SharedMemory): The shared memory block holding the cache.
+        words (memoryview): The block seen as int64 words.
+        lock: The lock held during every operation.
+
+        Raises:
+            ValueError: If capacity is less than 1, value_size is negative, or
+                named_lock is used without fcntl.
+        """
+        if named_lock and fcntl is None:
+            raise ValueError("named_lock needs the fcntl module")
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        if value_size < 0:
+            raise ValueError("value_size must not be negative")
+        buckets = 1 << max(1, (2 * capacity - 1).bit_length())
+        value_words = max(1, -(-value_size // 8))
+        slot_words = self._SLOT_HEADER_WORDS + value_words
+        size = 8 * (self._HEADER_WORDS + buckets + capacity * slot_words)
+
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        SharedLRUCache._created.add(self.shm.name)
+        if named_lock:
+            self.lock = _NamedLock(self.shm.name)
+        else:
+            self.lock = lock if lock is not None else multiprocessing.Lock()
+        self.words = words = self.shm.buf.cast("q")
+        words[0] = self._MAGIC
+        words[self._CAPACITY] = capacity
+        words[self._VALUE_SIZE] = value_size
+        words[self._BUCKETS] = buckets
+        words[self._HEAD] = -1
+        words[self._TAIL] = -1
+        words[self._FREE] = 0
+        words[self._COUNT] = 0
+        words[self._NAMED] = named_lock
+        self._read_header()
+        for bucket in range(buckets):
+            words[self._HEADER_WORDS + bucket] = -1
+        # Chain every slot onto the free list through its next word
+        for slot in range(capacity):
+            base = self.slots_start + slot * self.slot_words
+            words[base + self._NEXT] = slot + 1 if slot + 1 < capacity else -1
+
+    @classmethod
+    def attach(cls, name: str, lock=None) -> "SharedLRUCache":
+        """
+        Attach to a cache created by another process.
+
+        Args:
+            name (str): The name of the shared memory block of the cache.
+            lock: The lock of the process that created the cache, or None if
+                it was created with named_lock.
+
+        Raises:
+            ValueError: If the block does not hold a SharedLRUCache, or there
+                is no lock to share with the other processes.
+        """
+        cache = cls.__new__(cls)
+        try:
+            # Only the creator should unlink the block when it exits
+            cache.shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Before Python 3.13 attaching registers the block with this
+            # process's resource tracker, which would unlink it on exit. The
+            # creator, and the processes it starts, which share its tracker,
+            # must keep the creator's registration.
+            cache.shm = shared_memory.SharedMemory(name=name)
+            if (
+                multiprocessing.parent_process() is None
+                and cache.shm.name not in cls._created
+            ):
+                resource_tracker.unregister(cache.shm._name, "shared_memory")
+        cache.words = cache.shm.buf.cast("q")
+        if cache.words[0] != cls._MAGIC:
+            cache.words.release()
+            cache.shm.close()
+            raise ValueError(f"shared memory {name!r} does not hold a SharedLRUCache")
+        cache._read_header()
+        if cache.named_lock:
+            cache.lock = _NamedLock(cache.shm.name)
+        elif lock is not None:
+            cache.lock = lock
+        else:
+            cache.words.release()
+            cache.shm.close()
+            raise ValueError(
+                f"the cache {name!r} has no named lock, pass the lock of its creator"
+            )
+        return cache
+
+    def _read_header(self) -> None:
+        self.capacity = self.words[self._CAPACITY]
+        self.value_size = self.words[self._VALUE_SIZE]
+        self.buckets = self.words[self._BUCKETS]
+        self.bucket_shift = 64 - (self.buckets.bit_length() - 1)
+        self.slot_words = self._SLOT_HEADER_WORDS + max(1, -(-self.value_size // 8))
+        self.slots_start = self._HEADER_WORDS + self.buckets
+        self.named_lock = bool(self.words[self._NAMED])
+
+    def __getstate__(self):
+        # Lets the cache be handed to multiprocessing.Process, which attaches to it
+        return {"name": self.shm.name, "lock": None if self.named_lock else self.lock}
+
+    def __setstate__(self, state):
+        attached = SharedLRUCache.attach(state["name"], state["lock"])
+        self.__dict__.update(attached.__dict__)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def get_capacity(self):
+        return self.capacity
+
+    def close(self) -> None:
+        """Detach this process from the cache, which stays available to the others."""
+        self.words.release()
+        self.shm.close()
+        if self.named_lock:
+            self.lock.close()
+
+    def unlink(self) -> None:
+        """Free the shared memory block, once every process is done with the cache."""
+        self.shm.unlink()
+        SharedLRUCache._created.discard(self.shm.name)
+        if self.named_lock:
+            self.lock.unlink()
+
+    def _bucket(self, key: int) -> int:
+        mixed = (key * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+        return self._HEADER_WORDS + (mixed >> self.bucket_shift)
+
+    def _find(self, key: int) -> int:
+        words = self.words
+        slot = words[self._bucket(key)]
+        while slot != -1:
+            base = self.slots_start + slot * self.slot_words
+            if words[base + self._KEY] == key:
+                return slot
+            slot = words[base + self._CHAIN]
+        return -1
+
+    def _unlink(self, slot: int) -> None:
+        # Take a slot out of the recency list
+        words = self.words
+        base = self.slots_start + slot * self.slot_words
+        prev, next = words[base + self._PREV], words[base + self._NEXT]
+        if prev == -1:
+            words[self._HEAD] = next
+        else:
+            words[self.slots_start + prev * self.slot_words + self._NEXT] = next
+        if next == -1:
+            words[self._TAIL] = prev
+        else:
+            words[self.slots_start + next * self.slot_words + self._PREV] = prev
+
+    def _append(self, slot: int) -> None:
+        # Put a slot at the most recently used end of the recency list
+        words = self.words
+        base = self.slots_start + slot * self.slot_words
+        tail = words[self._TAIL]
+        words[base + self._PREV] = tail
+        words[base + self._NEXT] = -1
+        if tail == -1:
+            words[self._HEAD] = slot
+        else:
+            words[self.slots_start + tail * self.slot_words + self._NEXT] = slot
+        words[self._TAIL] = slot
+
+    def _evict(self) -> int:
+        # Remove the least recently used entry and return its slot
+        words = self.words
+        slot = words[self._HEAD]
+        self._unlink(slot)
+        base = self.slots_start + slot * self.slot_words
+        link = self._bucket(words[base + self._KEY])
+        while words[link] != slot:
+            link = self.slots_start + words[link] * self.slot_words + self._CHAIN
+        words[link] = words[base + self._CHAIN]
+        words[self._COUNT] -= 1
+        return slot
+
+    def _read_value(self, base: int):
+        length = self.words[base + self._LENGTH]
+        start = base + self._SLOT_HEADER_WORDS
+        if length == self._INT_VALUE:
+            return self.words[start]
+        return bytes(self.shm.buf[8 * start : 8 * start + length])
+
+    def _write_value(self, base: int, value) -> None:
+        start = base + self._SLOT_HEADER_WORDS
+        if isinstance(value, int):
+            self.words[start] = value
+            self.words[base + self._LENGTH] = self._INT_VALUE
+        else:
+            self.shm.buf[8 * start : 8 * start + len(value)] = value
+            self.words[base + self._LENGTH] = len(value)
+
+    def get(self, key: int) -> int:
+        """
+        Retrieve an item from the cache by its key.
+
+        Args:
+            key (int): The key of the item to retrieve.
+
+        Returns:
+            The int or bytes value associated with the key if it exists, else -1.
+
+        Time Complexity:
+            O(1) on average, plus the time spent waiting for the lock.
+        """
+        with self.lock:
+            slot = self._find(key)
+            if slot == -1:
+                return -1
+            self._unlink(slot)
+            self._append(slot)
+            return self._read_value(self.slots_start + slot * self.slot_words)
+
+    def set(self, key: int, value) -> None:
+        """
+        Add or update a key-value pair in the cache.
+
+        Args:
+            key (int): The key of the item to add or update, a signed 64-bit int.
+            value (int or bytes): The value, a signed 64-bit int or at most
+                value_size bytes.
+
+        Raises:
+            TypeError: If the key is not an int or the value is not an int or bytes.
+            ValueError: If an int does not fit in 64 bits or a bytes value is
+                longer than value_size.
+
+        Time Complexity:
+            O(1) on average, plus the time spent waiting for the lock.
+        """
+        if not isinstance(key, int):
+            raise TypeError(f"key must be an int, not {type(key).__name__}")
+        if not _INT64_MIN <= key <= _INT64_MAX:
+            raise ValueError("key does not fit in a signed 64-bit int")
+        if isinstance(value, int):
+            if not _INT64_MIN <= value <= _INT64_MAX:
+                raise ValueError("value does not fit in a signed 64-bit int")
+        else:
+            if not isinstance(value, (bytes, bytearray, memoryview)):
+                raise TypeError(
+                    f"value must be an int or bytes, not {type(value).__name__}"
+                )
+            if len(value) > self.value_size:
+                raise ValueError(
+                    f"value of {len(value)} bytes is more than value_size {self.value_size}"
+                )
+
+        with self.lock:
+            words = self.words
+            slot = self._find(key)
+            if slot != -1:
+                self._unlink(slot)
+            else:
+                if words[self._FREE] == -1:
+                    slot = self._evict()
+                else:
+                    slot = words[self._FREE]
+                    words[self._FREE] = words[
+                        self.slots_start + slot * self.slot_words + self._NEXT
+                    ]
+                base = self.slots_start + slot * self.slot_words
+                bucket = self._bucket(key)
+                words[base + self._KEY] = key
+                words[base + self._CHAIN] = words[bucket]
+                words[bucket] = slot
+                words[self._COUNT] += 1
+            self._write_value(self.slots_start + slot * self.slot_words, value)
+            self._append(slot)
+
+    def keys(self) -> list:
+        """
+        Return the keys in the cache from least to most recently used.
+
+        Time Complexity: O(n), where n is the number of entries.
+        """
+        with self.lock:
+            keys = []
+            slot = self.words[self._HEAD]
+            while slot != -1:
+                base = self.slots_start + slot * self.slot_words
+                keys.append(self.words[base + self._KEY])
+                slot = self.words[base + self._NEXT]
+            return keys
+
+    def __len__(self) -> int:
+        return self.words[self._COUNT]
+
+
+class IntLRUCache(object):
+    def __init__(self, capacity: int):
+        """
+        Initialise an LRU Cache of int keys and values stored in flat arrays.
+
+        Behaves exactly like LRU_Cache restricted to signed 64-bit int keys and
+        values, but stores no Python object per entry. Slot i of the keys,
+        values, prev and next arrays holds one entry and its neighbours in
+        recency order. An open addressing table with linear probing maps keys
+        to slots. The table has between 2 and 4 buckets per entry, so an entry
+        costs 8 + 8 bytes for its key and value, 4 + 4 bytes for its links and
+        8 to 16 bytes of table: 32 to 40 bytes in all (links and buckets take
+        8 bytes each instead of 4 when capacity is 2**31 or more).
+
+        Attributes:
+        capacity (int): The maximum number of key-value pairs the cache can hold.
+        slot_keys (array): The key of each slot.
+        slot_values (array): The value of each slot.
+        prev (array): The previous slot in recency order, -1 for the head.
+        next (array): The next slot in recency order, -1 for the tail.
+        table (array): The slot of each bucket, -1 for an empty bucket.
+        head (int): The least recently used slot.
+        tail (int): The most recently used slot.
+        count (int): The number of entries in the cache.
+
+        Raises:
+            ValueError: If capacity is less than 1.
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        buckets = 1 << max(1, (2 * capacity - 1).bit_length())
+        link = "i" if buckets < 1 << 31 else "q"
+        self.capacity = capacity
+        self.slot_keys = array("q", bytes(8 * capacity))
+        self.slot_values = array("q", bytes(8 * capacity))
+        self.prev = array(link, [-1]) * capacity
+        self.next = array(link, [-1]) * capacity
+        self.table = array(link, [-1]) * buckets
+        self.mask = buckets - 1
+        self.shift = 64 - (buckets.bit_length() - 1)
+        self.head = -1
+        self.tail = -1
+        self.count = 0
+
+    def get_capacity(self):
+        return self.capacity
+
+    def _home(self, key: int) -> int:
+        return ((key * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> self.shift
+
+    def _probe(self, key: int) -> tuple:
+        # Return the bucket holding key, or the empty bucket where it would go, and its slot
+        table = self.table
+        slot_keys = self.slot_keys
+        mask = self.mask
+        bucket = self._home(key)
+        while True:
+            slot = table[bucket]
+            if slot == -1 or slot_keys[slot] == key:
+                return bucket, slot
+            bucket = (bucket + 1) & mask
+
+    def _unindex(self, bucket: int) -> None:
+        # Empty a bucket, shifting later buckets of the probe run back into the gap
+        table = self.table
+        slot_keys = self.slot_keys
+        mask = self.mask
+        gap = bucket
+        table[gap] = -1
+        bucket = (gap + 1) & mask
+        while table[bucket] != -1:
+            home = self._home(slot_keys[table[bucket]])
+            # The entry may fill the gap unless its home lies after the gap
+            if (bucket - home) & mask >= (bucket - gap) & mask:
+                table[gap] = table[bucket]
+                table[bucket] = -1
+                gap = bucket
+            bucket = (bucket + 1) & mask
+
+    def _unlink(self, slot: int) -> None:
+        prev, next = self.prev[slot], self.next[slot]
+        if prev == -1:
+            self.head = next
+        else:
+            self.next[prev] = next
+        if next == -1:
+            self.tail = prev
+        else:
+            self.prev[next] = prev
+
+    def _append(self, slot: int) -> None:
+        self.prev[slot] = self.tail
+        self.next[slot] = -1
+        if self.tail == -1:
+            self.head = slot
+        else:
+            self.next[self.tail] = slot
+        self.tail = slot
+
+    def get(self, key: int) -> int:
+        """
+        Retrieve an item from the cache by its key.
+
+        Args:
+            key (int): The key of the item to retrieve.
+
+        Returns:
+            int: The value associated with the key if it exists, else -1.
+
+        Time Complexity:
+            O(1) on average. The table is at most half full, so probe runs are short.
+        """
+        if not isinstance(key, int) or not _INT64_MIN <= key <= _INT64_MAX:
+            return -1
+        bucket, slot = self._probe(key)
+        if slot == -1:
+            return -1
+        if slot != self.tail:
+            self._unlink(slot)
+            self._append(slot)
+        return self.slot_values[slot]
+
+    def set(self, key: int, value: int) -> None:
+        """
+        Add or update a key-value pair in the cache.
+
+        Once the cache is full, the slot of the least recently used entry is
+        reused for the new entry.
+
+        Args:
+            key (int): The key of the item to add or update, a signed 64-bit int.
+            value (int): The value to associate with the key, a signed 64-bit int.
+
+        Raises:
+            OverflowError: If the key or value does not fit in 64 bits.
+            TypeError: If the key or value is not an int.
+
+        Time Complexity:
+            O(1) on average.
+        """
+        for item in (key, value):
+            if not isinstance(item, int):
+                raise TypeError(
+                    f"keys and values must be ints, not {type(item).__name__}"
+                )
+            if not _INT64_MIN <= item <= _INT64_MAX:
+                raise OverflowError("keys and values must fit in a signed 64-bit int")
+
+        bucket, slot = self._probe(key)
+        if slot != -1:
+            self.slot_values[slot] = value
+            if slot != self.tail:
+                self._unlink(slot)
+                self._append(slot)
+            return
+
+        if self.count < self.capacity:
+            slot = self.count
+            self.count += 1
+        else:
+            slot = self.head
+            self._unlink(slot)
+            self._unindex(self._probe(self.slot_keys[slot])[0])
+            bucket, _ = self._probe(key)
+        self.slot_keys[slot] = key
+        self.slot_values[slot] = value
+        self.table[bucket] = slot
+        self._append(slot)
+
+    def keys(self) -> list:
+        """
+        Return the keys in the cache from least to most recently used.
+
+        Time Complexity: O(n), where n is the number of entries.
+        """
+        keys = []
+        slot = self.head
+        while slot != -1:
+            keys.append(self.slot_keys[slot])
+            slot = self.next[slot]
+        return keys
+
+    def __len__(self) -> int:
+        return self.count
 
 
 """
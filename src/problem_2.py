@@ -1,7 +1,524 @@
+import asyncio
+import fnmatch
+import json
 import os
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
 
+# The scans the ordered thread pool walk keeps outstanding, per worker
+_SCAN_AHEAD = 4
 
-def find_files(suffix: str, path: str) -> list:
+
+def iter_files(
+    suffix: str,
+    path: str,
+    workers: int = 1,
+    ordered: bool = True,
+    exclude=None,
+    max_depth: int = None,
+    follow_symlinks: bool = True,
+):
+    """
+    Yield every file beneath path with file name suffix.
+
+    Walks the tree with an explicit stack of directories instead of recursion,
+    so there is no limit on the depth of the tree, and yields each path as
+    soon as os.scandir produces it. Only one directory is open at a time.
+
+    Directories are visited depth first in the order os.scandir lists them.
+    The files of a directory come before the files of its subdirectories.
+
+    With workers above 1, directories are scanned by a pool of that many
+    threads, which helps when scandir waits on the disk or the network. With
+    ordered, paths come out in the same order as with one worker. Without it,
+    paths come out as soon as any directory is scanned.
+
+    Subdirectories whose name matches an exclude pattern, such as ".git" or
+    "node_modules", are never scanned. When following symlinks, every
+    directory is walked once however many links lead to it, so symlink loops
+    end instead of repeating forever.
+
+    Args:
+      suffix(str): suffix if the file name to be found
+      path(str): path of the file system
+      workers(int): number of threads scanning directories
+      ordered(bool): keep the order of the single threaded walk
+      exclude(iterable): glob patterns of directory names to skip
+      max_depth(int): how many levels of subdirectories to descend into,
+        0 for the files directly in path, None for no limit
+      follow_symlinks(bool): descend into symlinks to directories
+
+    Yields:
+        str: the path of each matching file
+
+    Time complexity:
+    O(n), where n is the total number of files and directories in the directory tree.
+    Memory is O(d) for the stack, where d is the number of directories seen but not
+    yet scanned, rather than O(n) for the results.
+
+    Note:
+        suffix may also be a tuple of suffixes, since it is passed to str.endswith.
+    """
+    walk = _Walk(exclude, max_depth, follow_symlinks)
+    if workers > 1:
+        yield from _iter_files_parallel(walk, suffix, path, workers, ordered)
+        return
+
+    stack = [walk.root(path)]
+    while stack:
+        item = stack.pop()
+        subdirectories = []
+        yield from walk.scan(suffix, *item, subdirectories)
+        # Reversed so the first subdirectory is scanned next
+        stack.extend(reversed(subdirectories))
+
+
+class _Walk:
+    """
+    The pruning, depth and symlink settings of one walk, and the directories it has seen.
+
+    When following symlinks, a directory is identified by its (st_dev, st_ino).
+    A symlinked directory needs a stat call for that, but any other
+    subdirectory is on the device of its parent, and os.scandir has already
+    read its inode, so it costs no syscall. The exception is a mount point,
+    whose device differs. The mount points are read once per walk, and
+    matched against the real path of each subdirectory, so only those are
+    stat'ed. Where the mount points cannot be read, every subdirectory is.
+    """
+
+    def __init__(self, exclude, max_depth: int, follow_symlinks: bool):
+        self.exclude = _combine_globs(exclude) if exclude else None
+        self.max_depth = max_depth
+        self.follow_symlinks = follow_symlinks
+        self.mount_points = _mount_points() if follow_symlinks else None
+        self.visited = set()
+        self.lock = threading.Lock()
+
+    def root(self, path: str) -> tuple:
+        """
+        Return the stack item of the directory the walk starts from.
+
+        A stack item is the path, the depth, and when following symlinks the
+        device and real path of the directory.
+        """
+        if not self.follow_symlinks:
+            return path, 0, None, None
+        stat = os.stat(path)
+        self.visited.add((stat.st_dev, stat.st_ino))
+        return path, 0, stat.st_dev, os.path.realpath(path)
+
+    def first_visit(self, identity: tuple) -> bool:
+        """Record a directory, returning False if the walk has already seen it."""
+        with self.lock:
+            if identity in self.visited:
+                return False
+            self.visited.add(identity)
+            return True
+
+    def descend_into(self, name: str, depth: int) -> bool:
+        """Return True if a subdirectory at depth with this name should be walked."""
+        if self.max_depth is not None and depth > self.max_depth:
+            return False
+        return self.exclude is None or self.exclude.match(name) is None
+
+    def scan(
+        self, suffix, directory: str, depth: int, device, real, subdirectories: list
+    ):
+        """
+        Yield the matching files of one directory.
+
+        The stack items of the subdirectories to walk next are appended to
+        subdirectories.
+        """
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        if entry.name.endswith(suffix):
+                            yield entry.path
+                    elif entry.is_dir(
+                        follow_symlinks=self.follow_symlinks
+                    ) and self.descend_into(entry.name, depth + 1):
+                        item = (entry.path, depth + 1, None, None)
+                        if self.follow_symlinks:
+                            item = self.follow(entry, depth + 1, device, real)
+                            if item is None:
+                                continue
+                        subdirectories.append(item)
+        except PermissionError:
+            print(f"Permission denied: {directory}")
+
+    def follow(self, entry, depth: int, device, real):
+        """Return the stack item of a subdirectory, or None if it was already seen."""
+        if entry.is_symlink():
+            stat = entry.stat()
+            real = os.path.realpath(entry.path)
+        else:
+            real = os.path.join(real, entry.name)
+            if self.mount_points is None or real in self.mount_points:
+                stat = entry.stat()
+            else:
+                stat = None
+        if stat is None:
+            identity = (device, entry.inode())
+        else:
+            device = stat.st_dev
+            identity = (device, stat.st_ino)
+        if not self.first_visit(identity):
+            return None
+        return entry.path, depth, device, real
+
+
+def _mount_points():
+    """
+    Return the set of mount point paths, or None if they cannot be read.
+
+    Spaces and other special characters in /proc/self/mounts are written as
+    octal escapes.
+    """
+    try:
+        with open("/proc/self/mounts", errors="surrogateescape") as file:
+            lines = file.read().splitlines()
+    except OSError:
+        return None
+    unescape = re.compile(r"\\([0-7]{3})")
+    return {
+        unescape.sub(lambda match: chr(int(match.group(1), 8)), line.split()[1])
+        for line in lines
+        if len(line.split()) > 1
+    }
+
+
+def _iter_files_ordered(executor, walk: _Walk, suffix, path: str, workers: int):
+    """Yield the matching files in depth first order, scanning ahead in executor."""
+    limit = _SCAN_AHEAD * workers
+    # Each entry is a stack item and the future of its scan, once submitted
+    stack = [[walk.root(path), None]]
+    outstanding = 0
+    while stack:
+        # Submit in the order the results are needed. A scan was just read, so
+        # there is room for the top of the stack.
+        for entry in reversed(stack[-limit:]):
+            if outstanding == limit:
+                break
+            if entry[1] is None:
+                entry[1] = executor.submit(_scan_directory, walk, suffix, entry[0])
+                outstanding += 1
+        item, future = stack.pop()
+        outstanding -= 1
+        if future.cancel():
+            # Still queued behind scans further ahead, so scan it here instead
+            files, subdirectories = _scan_directory(walk, suffix, item)
+        else:
+            files, subdirectories = future.result()
+        yield from files
+        stack.extend([item, None] for item in reversed(subdirectories))
+
+
+def _scan_directory(walk: _Walk, suffix, item: tuple) -> tuple:
+    """
+    Scan one directory for the thread pool.
+
+    Returns:
+        tuple[list, list]: the matching files and the stack items of the subdirectories
+    """
+    subdirectories = []
+    files = list(walk.scan(suffix, *item, subdirectories))
+    return files, subdirectories
+
+
+def _iter_files_parallel(walk: _Walk, suffix, path: str, workers: int, ordered: bool):
+    """
+    Walk the tree with a pool of threads, each scanning one directory at a time.
+
+    In ordered mode the directories are kept on a stack in depth first order,
+    and the pool scans ahead of the caller, submitting them in the order
+    their files are needed. At most _SCAN_AHEAD scans per worker are
+    outstanding, so the results held at once stay bounded rather than
+    growing with the tree. Otherwise, every directory found is submitted
+    straight away, and the results of whichever scans finish first are
+    yielded first.
+
+    Time complexity: O(n), the same work as the single threaded walk.
+    """
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        if ordered:
+            yield from _iter_files_ordered(executor, walk, suffix, path, workers)
+            return
+        root = executor.submit(_scan_directory, walk, suffix, walk.root(path))
+        pending = {root}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirectories = future.result()
+                yield from files
+                pending.update(
+                    executor.submit(_scan_directory, walk, suffix, item)
+                    for item in subdirectories
+                )
+    finally:
+        # Stop scanning if the caller stops reading early
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def async_find_files(
+    suffix: str,
+    path: str,
+    concurrency: int = 4,
+    batch_size: int = 1000,
+    executor=None,
+    exclude=None,
+    max_depth: int = None,
+    follow_symlinks: bool = True,
+):
+    """
+    Yield every file beneath path with file name suffix, without blocking the event loop.
+
+    Every blocking os.scandir call runs in executor, the loop's default one
+    if None, so other tasks keep running during a walk. At most concurrency
+    directories are being scanned at once, and each hands back at most
+    batch_size paths at a time, so neither a wide tree nor a huge directory is
+    buffered in memory. Paths are yielded as batches complete, so their order
+    is not fixed.
+
+    No new scans are started while the caller is busy with a path. When the
+    generator is closed or the task reading it is cancelled, scans that have
+    not started are cancelled, and a scan already running finishes its batch
+    in the background.
+
+    Args:
+      suffix(str): suffix if the file name to be found
+      path(str): path of the file system
+      concurrency(int): most directories scanned at the same time
+      batch_size(int): most paths handed back by one executor call
+      executor(Executor): where scans run, or None for the loop's default
+      exclude(iterable): glob patterns of directory names to skip
+      max_depth(int): how many levels of subdirectories to descend into
+      follow_symlinks(bool): descend into symlinks to directories
+
+    Yields:
+        str: the path of each matching file
+
+    Time complexity: O(n), the same work as iter_files.
+    """
+    loop = asyncio.get_running_loop()
+    walk = _Walk(exclude, max_depth, follow_symlinks)
+    waiting = [await loop.run_in_executor(executor, walk.root, path)]
+    # The future of each running batch, with its scan and the subdirectories it found
+    running = {}
+
+    def submit(scan, subdirectories):
+        batch = loop.run_in_executor(executor, _next_batch, scan, batch_size)
+        running[batch] = (scan, subdirectories)
+
+    try:
+        while waiting or running:
+            while waiting and len(running) < concurrency:
+                subdirectories = []
+                submit(
+                    walk.scan(suffix, *waiting.pop(), subdirectories), subdirectories
+                )
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for batch in done:
+                scan, subdirectories = running.pop(batch)
+                files = batch.result()
+                if len(files) == batch_size:
+                    # The directory may have more, keep its slot
+                    submit(scan, subdirectories)
+                else:
+                    waiting.extend(reversed(subdirectories))
+                for file in files:
+                    yield file
+    finally:
+        for batch in running:
+            batch.cancel()
+
+
+def _next_batch(scan, batch_size: int) -> list:
+    """Return up to batch_size paths from a directory scan, fewer once it is done."""
+    return list(islice(scan, batch_size))
+
+
+def _combine_globs(patterns) -> re.Pattern:
+    """Compile glob patterns into one regular expression matching any of them."""
+    return re.compile("|".join(fnmatch.translate(pattern) for pattern in patterns))
+
+
+class FileIndex:
+    """
+    A persistent index of directory listings for repeated find_files queries.
+
+    For every directory it has scanned, the index keeps the directory mtime and
+    the names of its files and subdirectories. A later query stats each
+    directory and only scans it again if its mtime changed, since adding,
+    removing or renaming an entry updates the mtime of its directory. Listings
+    are kept for every file, so one index serves queries for any suffix.
+
+    A directory modified within mtime_granularity_ns of being scanned may
+    change again without its mtime moving, so it is scanned again next time.
+
+    Attributes:
+        path (str): The file the index is saved to, or None to keep it in memory.
+        directories (dict): For each directory path, a list of its mtime, the
+            time it was scanned (both in ns), its file names, its subdirectory
+            names, and the names of the subdirectories that are symlinks.
+    """
+
+    VERSION = 2
+    mtime_granularity_ns = 2_000_000_000
+
+    def __init__(self, path: str = None):
+        """
+        Initialise the index, loading it from path if that file exists.
+
+        Args:
+          path(str): the file to load the index from and save it to
+        """
+        self.path = path
+        self.directories = {}
+        if path is not None and os.path.exists(path):
+            with open(path) as file:
+                data = json.load(file)
+            if data.get("version") == self.VERSION:
+                self.directories = data["directories"]
+
+    def save(self) -> None:
+        """
+        Write the index to its file, replacing the file in one step.
+
+        Time complexity: O(n), where n is the number of entries in the index.
+        """
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as file:
+            json.dump({"version": self.VERSION, "directories": self.directories}, file)
+        os.replace(temporary, self.path)
+
+    def invalidate(self, path: str = None) -> None:
+        """
+        Forget the listing of path and every directory beneath it.
+
+        Args:
+          path(str): the directory to forget, or None to forget every directory
+
+        Time complexity: O(n), where n is the number of directories in the index.
+        """
+        if path is None:
+            self.directories.clear()
+            return
+        path = path.rstrip(os.sep)
+        prefix = path + os.sep
+        for directory in [
+            directory
+            for directory in self.directories
+            if directory == path or directory.startswith(prefix)
+        ]:
+            del self.directories[directory]
+
+    def _listing(self, directory: str) -> tuple:
+        """
+        Return the listing of directory, scanning it if needed, and its (st_dev, st_ino).
+
+        Raises:
+            OSError: If the directory cannot be read.
+        """
+        stat = os.stat(directory)
+        identity = (stat.st_dev, stat.st_ino)
+        mtime = stat.st_mtime_ns
+        cached = self.directories.get(directory)
+        if cached is not None:
+            cached_mtime, scanned = cached[:2]
+            if cached_mtime == mtime and scanned - mtime >= self.mtime_granularity_ns:
+                return cached, identity
+
+        scanned = time.time_ns()
+        files = []
+        subdirectories = []
+        symlinks = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    files.append(entry.name)
+                elif entry.is_dir():
+                    subdirectories.append(entry.name)
+                    if entry.is_symlink():
+                        symlinks.append(entry.name)
+        if cached is not None:
+            # Drop the listings of subdirectories that are gone
+            for name in set(cached[3]) - set(subdirectories):
+                self.invalidate(os.path.join(directory, name))
+        listing = [mtime, scanned, files, subdirectories, symlinks]
+        self.directories[directory] = listing
+        return listing, identity
+
+    def iter_files(
+        self,
+        suffix: str,
+        path: str,
+        exclude=None,
+        max_depth: int = None,
+        follow_symlinks: bool = True,
+    ):
+        """
+        Yield every file beneath path with file name suffix, using the index.
+
+        Walks the tree like the module level iter_files, but only scans the
+        directories whose mtime changed since the index last saw them. The
+        stat call that checks the mtime also identifies the directory, so
+        symlink loops are caught the same way.
+
+        Args:
+          suffix(str): suffix if the file name to be found
+          path(str): path of the file system
+          exclude(iterable): glob patterns of directory names to skip
+          max_depth(int): how many levels of subdirectories to descend into
+          follow_symlinks(bool): descend into symlinks to directories
+
+        Yields:
+            str: the path of each matching file
+
+        Time complexity:
+        O(n) for the entries of the tree, but unchanged directories cost one stat
+        call instead of a scan.
+        """
+        walk = _Walk(exclude, max_depth, follow_symlinks)
+        stack = [(path, 0)]
+        while stack:
+            directory, depth = stack.pop()
+            try:
+                listing, identity = self._listing(directory)
+            except PermissionError:
+                print(f"Permission denied: {directory}")
+                continue
+            except FileNotFoundError:
+                self.invalidate(directory)
+                continue
+            if follow_symlinks and not walk.first_visit(identity):
+                continue
+            _, _, files, subdirectories, symlinks = listing
+            for name in files:
+                if name.endswith(suffix):
+                    yield os.path.join(directory, name)
+            for name in reversed(subdirectories):
+                if walk.descend_into(name, depth + 1) and (
+                    follow_symlinks or name not in symlinks
+                ):
+                    stack.append((os.path.join(directory, name), depth + 1))
+
+
+def find_files(
+    suffix: str,
+    path: str,
+    workers: int = 1,
+    ordered: bool = True,
+    index: FileIndex = None,
+    exclude=None,
+    max_depth: int = None,
+    follow_symlinks: bool = True,
+) -> list:
     """
     Find all files beneath path with file name suffix.
 
@@ -13,6 +530,14 @@ def find_files(suffix: str, path: str) -> list:
     Args:
       suffix(str): suffix if the file name to be found
       path(str): path of the file system
+      workers(int): number of threads scanning directories, see iter_files
+      ordered(bool): keep the order of the single threaded walk
+      index(FileIndex): serve unchanged directories from this index instead
+        of scanning them, workers and ordered are ignored
+      exclude(iterable): glob patterns of directory names to skip
+      max_depth(int): how many levels of subdirectories to descend into,
+        0 for the files directly in path, None for no limit
+      follow_symlinks(bool): descend into symlinks to directories
 
     Returns:
         a list of paths
@@ -21,18 +546,117 @@ def find_files(suffix: str, path: str) -> list:
     O(n), where n is the total number of files and directories in the directory tree.
     Each file and directory is processed once with constant-time operations.
     """
-    result = []
+    if index is not None:
+        return list(index.iter_files(suffix, path, exclude, max_depth, follow_symlinks))
+    return list(
+        iter_files(suffix, path, workers, ordered, exclude, max_depth, follow_symlinks)
+    )
 
-    try:
-        with os.scandir(path) as entries:
-            for entry in entries:
-                if entry.is_file() and entry.name.endswith(suffix):
-                    result.append(entry.path)
-                elif entry.is_dir():
-                    result.extend(find_files(suffix, entry.path))
-    except PermissionError:
-        print(f"Permission denied: {path}")
-    return result
+
+class PatternMatcher:
+    """
+    Matches file names against several suffixes and glob patterns at once.
+
+    The patterns are compiled once: the suffixes into one tuple for
+    str.endswith, and the globs into one regular expression with an
+    alternative per glob, so most names are rejected by two calls. A name that
+    passes is then checked against each pattern, since it can match several.
+
+    A pattern containing *, ? or [ is a glob matched against the whole file
+    name, like fnmatch.fnmatchcase. Any other pattern is a suffix.
+
+    Attributes:
+        patterns (list): The patterns, in the order given.
+        suffixes (tuple): The suffix patterns.
+        globs (list): Each glob pattern with its compiled regular expression.
+        any_glob (re.Pattern): Matches a name that matches any glob, or None.
+    """
+
+    def __init__(self, patterns):
+        """
+        Compile the patterns.
+
+        Args:
+          patterns(iterable): suffixes and glob patterns
+        """
+        self.patterns = list(dict.fromkeys(patterns))
+        self.suffixes = tuple(
+            pattern for pattern in self.patterns if not _is_glob(pattern)
+        )
+        self.globs = [
+            (pattern, re.compile(fnmatch.translate(pattern)))
+            for pattern in self.patterns
+            if _is_glob(pattern)
+        ]
+        self.any_glob = None
+        if self.globs:
+            self.any_glob = _combine_globs(pattern for pattern, _ in self.globs)
+
+    def match(self, name: str) -> list:
+        """
+        Return every pattern that name matches.
+
+        Time complexity: O(1) for a name that matches nothing, else O(p) for p patterns.
+        """
+        matched = []
+        if name.endswith(self.suffixes):
+            matched.extend(suffix for suffix in self.suffixes if name.endswith(suffix))
+        if self.any_glob is not None and self.any_glob.match(name) is not None:
+            matched.extend(
+                pattern for pattern, regex in self.globs if regex.match(name)
+            )
+        return matched
+
+
+def _is_glob(pattern: str) -> bool:
+    return any(character in pattern for character in "*?[")
+
+
+def match_files(
+    patterns,
+    path: str,
+    workers: int = 1,
+    ordered: bool = True,
+    index: FileIndex = None,
+    exclude=None,
+    max_depth: int = None,
+    follow_symlinks: bool = True,
+) -> dict:
+    """
+    Find the files beneath path matching each of several patterns in one walk.
+
+    Args:
+      patterns(iterable): suffixes such as ".c" and glob patterns such as
+        "test_*.py", see PatternMatcher
+      path(str): path of the file system
+      workers(int): number of threads scanning directories, see iter_files
+      ordered(bool): keep the order of the single threaded walk
+      index(FileIndex): serve unchanged directories from this index
+      exclude(iterable): glob patterns of directory names to skip
+      max_depth(int): how many levels of subdirectories to descend into
+      follow_symlinks(bool): descend into symlinks to directories
+
+    Returns:
+        dict: for each pattern, the list of paths of the files matching it.
+        A file matching several patterns is listed under each of them.
+
+    Time complexity:
+    O(n + m * p), where n is the number of files and directories, m the number
+    of matching files and p the number of patterns.
+    """
+    matcher = PatternMatcher(patterns)
+    groups = {pattern: [] for pattern in matcher.patterns}
+    if index is not None:
+        files = index.iter_files("", path, exclude, max_depth, follow_symlinks)
+    else:
+        files = iter_files(
+            "", path, workers, ordered, exclude, max_depth, follow_symlinks
+        )
+    for file_path in files:
+        name = file_path[file_path.rfind(os.sep) + 1 :]
+        for pattern in matcher.match(name):
+            groups[pattern].append(file_path)
+    return groups
 
 
 # Add your own test cases: include at least three test cases
@@ -1,6 +1,13 @@
 import sys
 import heapq
+import itertools
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, bytes are then counted and packed without it
+    np = None
 
 
 class Node:
@@ -71,19 +78,34 @@ class Node:
         return self.char is not None  # Leaf nodes come before internal nodes
 
 
-def huffman_encoding(data: str) -> tuple[str, Node]:
+def huffman_encoding(
+    data: str, packed: bool = False, header: bool = False, max_code_length: int = None
+) -> tuple[str, Node]:
     """ "
     Create a Huffman tree and encode the input data.
 
     This method implements the Huffman coding algorithm to compress the input string.
 
     Args:
-        data (str): The input string to be encoded.
+        data (str): The input string to be encoded, or bytes, bytearray or
+            memoryview. Bytes are counted with byte_frequency() and packed
+            with pack_bytes(), and decode back to bytes.
+        packed (bool): Pack the encoded bits into bytes, 8 per byte, instead
+            of returning a string with one '0' or '1' character per bit.
+        header (bool): Pack the bits with canonical codes, after a header
+            of their lengths, so the bytes can be decoded without the tree.
+        max_code_length (int): The longest code allowed. If the Huffman tree
+            has longer codes, the code lengths come from
+            limited_code_lengths() instead, and the codes are canonical.
 
     Returns:
         tuple[str, Node]: A tuple containing the encoded data as a string and
                           the root node of the Huffman tree.
                           Returns (None, None) if the input data is empty.
+        With packed, a tuple of the encoded bytes, the number of bits in them
+        (the last byte is padded with zero bits) and the root node.
+        With header, a tuple of the self-contained encoded bytes and the root
+        node of the tree of the canonical codes.
 
     Process:
     1. Check if input data exists.
@@ -105,8 +127,49 @@ def huffman_encoding(data: str) -> tuple[str, Node]:
     if not data:
         return None
 
+    text = isinstance(data, str)
+    if text:
+        frequency = Counter(data)
+        pack = pack_bits
+    else:
+        data = memoryview(data).cast("B")
+        frequency = byte_frequency(data)
+        pack = pack_bytes
+    root = build_tree(frequency)
+    codes = generate_codes(root)
+    if max_code_length is not None and max(map(len, codes.values())) > max_code_length:
+        codes = canonical_codes(limited_code_lengths(frequency, max_code_length))
+        root = tree_from_codes(codes, frequency)
+    if header:
+        lengths = code_lengths(codes)
+        codes = canonical_codes(lengths)
+        encoded_bytes, bit_length = pack(data, bit_codes(codes))
+        payload = bytearray(b"t" if text else b"b")
+        payload += write_header(lengths)
+        _write_varint(payload, bit_length)
+        payload += encoded_bytes
+        return bytes(payload), tree_from_codes(codes, frequency)
+    if packed:
+        encoded_bytes, bit_length = pack(data, bit_codes(codes))
+        return encoded_bytes, bit_length, root
+    encoded_data = "".join(codes[char] for char in data)
+    return encoded_data, root
+
+
+def build_tree(frequency: dict) -> Node:
+    """
+    Build a Huffman tree by repeatedly merging the two least frequent nodes.
+
+    Args:
+        frequency (dict): The number of times each character occurs.
+
+    Returns:
+        Node: The root node of the Huffman tree.
+
+    Time Complexity:
+        O(k log k), where k is the number of unique characters.
+    """
     Node._node_count = 0  # Reset node count for each encoding
-    frequency = Counter(data)
     heap = [Node(freq, char) for char, freq in frequency.items()]
     heapq.heapify(heap)
 
@@ -118,10 +181,7 @@ def huffman_encoding(data: str) -> tuple[str, Node]:
         merged.right = right
         heapq.heappush(heap, merged)
 
-    root = heap[0]
-    codes = generate_codes(root)
-    encoded_data = "".join(codes[char] for char in data)
-    return encoded_data, root
+    return heap[0]
 
 
 # Helper function to generate codes
@@ -165,7 +225,428 @@ def generate_codes(root: Node) -> dict:
     return codes
 
 
-def huffman_decoding(data: str, tree: Node) -> str:
+def bit_codes(codes: dict) -> dict:
+    """
+    Convert the codes from generate_codes to (code, length) pairs of integers.
+
+    A tree of one leaf gives its character the empty code, which cannot be
+    counted in packed output, so it is given the one bit code 0 instead.
+
+    Args:
+        codes (dict): Huffman codes as strings of '0's and '1's.
+
+    Returns:
+        dict: For each character, its code as an integer and the code's length in bits.
+
+    Time Complexity:
+        O(k), where k is the number of unique characters.
+    """
+    return {char: (int(code or "0", 2), len(code) or 1) for char, code in codes.items()}
+
+
+def code_lengths(codes: dict) -> dict:
+    """
+    Return the length of the code of each character.
+
+    A tree of one leaf gives its character the empty code, which is counted
+    as one bit, the same as in bit_codes().
+
+    Args:
+        codes (dict): Huffman codes as strings of '0's and '1's, from generate_codes().
+
+    Returns:
+        dict: For each character, the length of its code in bits.
+    """
+    return {char: len(code) or 1 for char, code in codes.items()}
+
+
+def limited_code_lengths(frequency: dict, max_length: int) -> dict:
+    """
+    Find the optimal code lengths with no code longer than max_length, by package-merge.
+
+    Start with a list of one item per character, weighted by its frequency,
+    sorted by weight. Then, max_length - 1 times, pair up neighbouring items
+    of the list into packages and merge the packages with the characters
+    into a new sorted list. The cheapest 2k - 2 items of the last list are
+    kept, and the code length of each character is the number of kept items
+    it is part of, directly or inside packages.
+
+    Args:
+        frequency (dict): The number of times each character occurs.
+        max_length (int): The longest code allowed.
+
+    Returns:
+        dict: The code length of each character.
+
+    Raises:
+        ValueError: If k characters cannot all get codes of max_length bits or fewer.
+
+    Time Complexity:
+        O(k * L * s), where k is the number of unique characters, L is
+        max_length and s is the characters in a package, at most k.
+    """
+    chars = sorted(frequency, key=lambda char: (frequency[char], char))
+    if len(chars) == 1:
+        return {chars[0]: 1}
+    if len(chars) > 1 << max_length:
+        raise ValueError(
+            f"{len(chars)} characters need codes longer than {max_length} bits"
+        )
+
+    # Each item is its weight and the positions in chars of the characters in it
+    leaves = [(frequency[char], (position,)) for position, char in enumerate(chars)]
+    items = leaves
+    for _ in range(max_length - 1):
+        packages = [
+            (left[0] + right[0], left[1] + right[1])
+            for left, right in zip(items[0::2], items[1::2])
+        ]
+        items = list(heapq.merge(leaves, packages, key=lambda item: item[0]))
+
+    counts = Counter()
+    for _, positions in items[: 2 * len(chars) - 2]:
+        counts.update(positions)
+    return {char: counts[position] for position, char in enumerate(chars)}
+
+
+def code_length_cost(frequency: dict, max_length: int) -> dict:
+    """
+    Report what limiting codes to max_length bits costs in compression.
+
+    Args:
+        frequency (dict): The number of times each character occurs.
+        max_length (int): The longest code allowed.
+
+    Returns:
+        dict: The longest Huffman code, the total bits of the data with
+              Huffman codes and with limited codes, and the cost, the
+              fraction by which the limited output is larger.
+    """
+    lengths = code_lengths(generate_codes(build_tree(frequency)))
+    limited = limited_code_lengths(frequency, max_length)
+    bits = sum(frequency[char] * length for char, length in lengths.items())
+    limited_bits = sum(frequency[char] * length for char, length in limited.items())
+    return {
+        "longest_code": max(lengths.values()),
+        "bits": bits,
+        "limited_bits": limited_bits,
+        "cost": limited_bits / bits - 1,
+    }
+
+
+def huffman_code_lengths(frequency: dict, max_code_length: int = None) -> dict:
+    """
+    Return the Huffman code lengths of frequency, limited to max_code_length if given.
+
+    Args:
+        frequency (dict): The number of times each character occurs.
+        max_code_length (int): The longest code allowed, or None for no limit.
+
+    Returns:
+        dict: The code length of each character, empty if frequency is.
+    """
+    if not frequency:
+        return {}
+    lengths = code_lengths(generate_codes(build_tree(frequency)))
+    if max_code_length is not None and max(lengths.values()) > max_code_length:
+        return limited_code_lengths(frequency, max_code_length)
+    return lengths
+
+
+def canonical_codes(lengths: dict) -> dict:
+    """
+    Assign canonical Huffman codes from code lengths alone.
+
+    Characters are sorted by code length, then by character. The first gets
+    all zeros, and each next one gets the code after the previous one,
+    shifted left when the length grows. Any code with the same lengths
+    compresses equally well, and this one can be rebuilt by the decoder from
+    the lengths, so the tree never has to be stored.
+
+    Args:
+        lengths (dict): The code length of each character.
+
+    Returns:
+        dict: The canonical code of each character as a string of '0's and '1's.
+
+    Time Complexity:
+        O(k log k), where k is the number of unique characters.
+    """
+    codes = {}
+    code = 0
+    previous_length = 0
+    for char, length in sorted(lengths.items(), key=lambda item: (item[1], item[0])):
+        code <<= length - previous_length
+        codes[char] = format(code, f"0{length}b")
+        code += 1
+        previous_length = length
+    return codes
+
+
+def tree_from_codes(codes: dict, frequency: dict) -> Node:
+    """
+    Build the tree whose paths spell out codes.
+
+    Args:
+        codes (dict): A prefix-free code of each character as a string of '0's and '1's.
+        frequency (dict): The number of times each character occurs.
+
+    Returns:
+        Node: The root node. Each internal node's frequency is the sum of its children's.
+
+    Time Complexity:
+        O(b), where b is the total length of the codes.
+    """
+    Node._node_count = 0
+    root = Node(0)
+    for char, code in codes.items():
+        node = root
+        node.freq += frequency[char]
+        for bit in code:
+            side = "right" if bit == "1" else "left"
+            if getattr(node, side) is None:
+                setattr(node, side, Node(0))
+            node = getattr(node, side)
+            node.freq += frequency[char]
+        node.char = char
+    return root
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    """Append a non negative integer, 7 bits per byte, low bits first."""
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, offset: int) -> tuple[int, int]:
+    """Read an integer written by _write_varint, returning it and the offset after it."""
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def write_header(lengths: dict) -> bytes:
+    """
+    Serialize code lengths into a compact header.
+
+    The header is the number of characters, then for each character its
+    code point and its code length. Numbers are varints, so a character
+    below U+0080 with its length takes 2 bytes.
+
+    Args:
+        lengths (dict): The code length of each character, or of each byte value.
+
+    Returns:
+        bytes: The header.
+    """
+    header = bytearray()
+    _write_varint(header, len(lengths))
+    for char, length in lengths.items():
+        _write_varint(header, ord(char) if isinstance(char, str) else char)
+        _write_varint(header, length)
+    return bytes(header)
+
+
+def read_header(data: bytes, offset: int = 0, text: bool = True) -> tuple[dict, int]:
+    """
+    Read a header written by write_header().
+
+    Args:
+        data (bytes): The bytes holding the header.
+        offset (int): Where the header starts.
+        text (bool): Whether the header holds characters rather than byte values.
+
+    Returns:
+        tuple[dict, int]: The code length of each character and the offset after the header.
+    """
+    lengths = {}
+    count, offset = _read_varint(data, offset)
+    for _ in range(count):
+        code_point, offset = _read_varint(data, offset)
+        char = chr(code_point) if text else code_point
+        lengths[char], offset = _read_varint(data, offset)
+    return lengths, offset
+
+
+# Bits collected before whole bytes are moved out of the accumulator. Keeping
+# it at a machine word keeps every shift on a small integer.
+_FLUSH_BITS = 64
+
+
+def pack_bits(data, codes: dict) -> tuple[bytes, int]:
+    """
+    Encode data and pack the bits of its codes into bytes.
+
+    Codes are shifted into an integer accumulator, and whole bytes are moved
+    out of it whenever it holds _FLUSH_BITS bits or more.
+
+    Args:
+        data: The characters to encode.
+        codes (dict): The (code, length) pair of each character, from bit_codes().
+
+    Returns:
+        tuple[bytes, int]: The packed bits, most significant bit first, and
+                           their number. The last byte is padded with zero bits.
+
+    Time Complexity:
+        O(n), where n is the length of the input.
+    """
+    packed = bytearray()
+    accumulator = 0
+    pending = 0  # Bits in the accumulator
+    for char in data:
+        code, length = codes[char]
+        accumulator = accumulator << length | code
+        pending += length
+        if pending >= _FLUSH_BITS:
+            kept = pending & 7
+            packed += (accumulator >> kept).to_bytes((pending - kept) >> 3, "big")
+            accumulator &= (1 << kept) - 1
+            pending = kept
+
+    bit_length = len(packed) * 8 + pending
+    if pending:
+        padding = -pending % 8
+        packed += (accumulator << padding).to_bytes((pending + padding) >> 3, "big")
+    return bytes(packed), bit_length
+
+
+# Every byte value, for finding the ones that occur with bytes.translate()
+_ALL_BYTES = bytes(range(256))
+
+# Above this many distinct byte values, one Counter pass beats a count per value
+_COUNT_LIMIT = 96
+
+
+def byte_frequency(data) -> dict:
+    """
+    Count the byte values of data.
+
+    With NumPy, this is one numpy.bincount over the buffer. Without it, the
+    values that occur are found with one bytes.translate() call, which
+    deletes them from a string of all 256, and each is counted with
+    bytes.count(). Both run at C speed. When most values occur, one Counter
+    pass is faster than a count per value, so that is used instead.
+
+    Args:
+        data: A bytes-like object.
+
+    Returns:
+        dict: The number of times each byte value occurs, for those that do.
+
+    Time Complexity:
+        O(n * v) without NumPy, where v is the number of distinct values up
+        to _COUNT_LIMIT, and O(n) otherwise.
+    """
+    if np is not None:
+        counts = np.bincount(np.frombuffer(data, dtype=np.uint8), minlength=256)
+        return {byte: int(counts[byte]) for byte in np.flatnonzero(counts).tolist()}
+
+    data = bytes(data)
+    present = set(_ALL_BYTES) - set(_ALL_BYTES.translate(None, data))
+    if len(present) > _COUNT_LIMIT:
+        return dict(Counter(data))
+    return {byte: data.count(byte) for byte in sorted(present)}
+
+
+# Byte values encoded per step of pack_bytes()
+_PACK_CHUNK = 1 << 16
+
+
+def pack_bytes(data, codes: dict) -> tuple[bytes, int]:
+    """
+    Encode bytes and pack the bits of their codes, a chunk at a time.
+
+    The same output as pack_bits(), but each chunk is encoded by C loops over
+    a 256 entry lookup table instead of a Python step per byte. With NumPy,
+    the table holds codes and lengths, the bits of every code in the chunk
+    are expanded into an array at once and numpy.packbits packs them.
+    Without it, the table holds each code as a string of '0's and '1's, the
+    chunk's strings are joined, and int(bits, 2).to_bytes() packs them.
+
+    Args:
+        data: A bytes-like object.
+        codes (dict): The (code, length) pair of each byte value, from bit_codes().
+
+    Returns:
+        tuple[bytes, int]: The packed bits, most significant bit first, and
+                           their number. The last byte is padded with zero bits.
+
+    Time Complexity:
+        O(n), where n is the length of the input.
+    """
+    if np is not None:
+        return _pack_bytes_numpy(data, codes)
+
+    strings = [""] * 256
+    for byte, (code, length) in codes.items():
+        strings[byte] = format(code, f"0{length}b")
+    data = memoryview(data).cast("B")
+    packed = bytearray()
+    pending = ""  # Bits that did not fill a whole byte
+    for start in range(0, len(data), _PACK_CHUNK):
+        bits = pending + "".join(
+            map(strings.__getitem__, data[start : start + _PACK_CHUNK])
+        )
+        whole = len(bits) & ~7
+        if whole:
+            packed += int(bits[:whole], 2).to_bytes(whole >> 3, "big")
+        pending = bits[whole:]
+
+    bit_length = len(packed) * 8 + len(pending)
+    if pending:
+        packed += int(pending.ljust(8, "0"), 2).to_bytes(1, "big")
+    return bytes(packed), bit_length
+
+
+def _pack_bytes_numpy(data, codes: dict) -> tuple[bytes, int]:
+    """pack_bytes() with NumPy arrays as the lookup table."""
+    width = max(length for _, length in codes.values())
+    # Row b holds the bits of the code of byte value b, and marks which are used
+    bit_table = np.zeros((256, width), dtype=np.uint8)
+    used_table = np.zeros((256, width), dtype=bool)
+    for byte, (code, length) in codes.items():
+        bit_table[byte, :length] = [
+            (code >> shift) & 1 for shift in range(length - 1, -1, -1)
+        ]
+        used_table[byte, :length] = True
+    symbols = np.frombuffer(data, dtype=np.uint8)
+
+    packed = bytearray()
+    pending = np.zeros(0, dtype=np.uint8)  # Bits that did not fill a whole byte
+    for start in range(0, len(symbols), _PACK_CHUNK):
+        chunk = symbols[start : start + _PACK_CHUNK]
+        bits = np.concatenate([pending, bit_table[chunk][used_table[chunk]]])
+        whole = len(bits) & ~7
+        packed += np.packbits(bits[:whole]).tobytes()
+        pending = bits[whole:]
+
+    bit_length = len(packed) * 8 + len(pending)
+    packed += np.packbits(pending).tobytes()
+    return bytes(packed), bit_length
+
+
+# The bits of every byte value, most significant first
+_BYTE_BITS = [
+    tuple((byte >> shift) & 1 for shift in range(7, -1, -1)) for byte in range(256)
+]
+
+
+# The width of the DecodeTable for data with a header
+_TABLE_BITS = 10
+
+
+def huffman_decoding(
+    data: str, tree: Node = None, bit_length: int = None, table_bits: int = None
+) -> str:
     """
     Decodes a Huffman-encoded string using the provided Huffman tree.
 
@@ -173,11 +654,17 @@ def huffman_decoding(data: str, tree: Node) -> str:
     reconstructing the original text.
 
     Args:
-        data (str): The Huffman-encoded string consisting of '0's and '1's.
-        tree (Node): The root node of the Huffman tree used for decoding.
+        data (str): The Huffman-encoded string consisting of '0's and '1's,
+            or the bytes from huffman_encoding(data, packed=True), or the
+            bytes from huffman_encoding(data, header=True).
+        tree (Node): The root node of the Huffman tree used for decoding,
+            or None when data starts with a header.
+        bit_length (int): The number of encoded bits when data is packed bytes.
+        table_bits (int): Decode packed bytes with a DecodeTable of this width
+            instead of walking the tree bit by bit.
 
     Returns:
-        str: The decoded string.
+        str: The decoded string, or bytes if bytes were encoded.
 
     Time Complexity:
         O(n), where n is the length of the encoded data string.
@@ -187,6 +674,20 @@ def huffman_decoding(data: str, tree: Node) -> str:
         - This function assumes that the provided Huffman tree corresponds to the encoded data.
         - The function resets to the root of the tree each time a character is decoded.
     """
+    if tree is None:
+        # Rebuild the codes from the header, no tree is needed
+        lengths, offset = read_header(data, 1, text=data[:1] == b"t")
+        bit_length, offset = _read_varint(data, offset)
+        decoder = DecodeTable(canonical_codes(lengths), table_bits or _TABLE_BITS)
+        return decoder.decode(memoryview(data)[offset:], bit_length)
+
+    if bit_length is not None:
+        if table_bits is not None:
+            return DecodeTable(generate_codes(tree), table_bits).decode(
+                data, bit_length
+            )
+        return _decode_packed(data, tree, bit_length)
+
     decoded_data = []
     current_node = tree
 
@@ -200,9 +701,489 @@ def huffman_decoding(data: str, tree: Node) -> str:
             decoded_data.append(current_node.char)
             current_node = tree  # Go back to the root for the next character
 
+    return _join(decoded_data, tree)
+
+
+def _decode_packed(data: bytes, tree: Node, bit_length: int) -> str:
+    """
+    Decode packed bytes by walking the tree, reading the bits of each byte from a table.
+
+    Time Complexity:
+        O(n), where n is bit_length.
+    """
+    if tree.char is not None:
+        # A tree of one leaf, every bit is a character
+        return _join([tree.char], tree) * bit_length
+
+    decoded_data = []
+    current_node = tree
+    whole_bytes, extra_bits = divmod(bit_length, 8)
+    byte_bits = map(_BYTE_BITS.__getitem__, data[:whole_bytes])
+    if extra_bits:
+        last_bits = _BYTE_BITS[data[whole_bytes]][:extra_bits]
+        byte_bits = itertools.chain(byte_bits, [last_bits])
+
+    for bits in byte_bits:
+        for bit in bits:
+            current_node = current_node.right if bit else current_node.left
+            if current_node.char is not None:
+                decoded_data.append(current_node.char)
+                current_node = tree
+
+    return _join(decoded_data, tree)
+
+
+def _join(decoded_data: list, tree: Node):
+    """Join decoded characters into a str, or into bytes if the tree is of byte values."""
+    node = tree
+    while node.char is None:
+        node = node.left
+    if isinstance(node.char, int):
+        return bytes(decoded_data)
     return "".join(decoded_data)
 
 
+class DecodeTable:
+    def __init__(self, codes: dict, table_bits: int = 8):
+        """
+        Build lookup tables that decode packed Huffman data several bits at a time.
+
+        The main table is indexed by the next table_bits bits of the data. Its
+        entry holds every character whose code fits completely in those bits,
+        often more than one, and how many bits they take. When the next code
+        is longer than table_bits, the entry points to a subtable instead.
+        The subtable is indexed by the bits after the first table_bits, up to
+        the longest code sharing those first bits.
+
+        Args:
+            codes (dict): The Huffman code of each character, from generate_codes().
+                The characters may be str, or byte values from bytes input.
+            table_bits (int): The number of bits looked up at once. The main
+                table has 2 ** table_bits entries.
+
+        Attributes:
+            table_bits (int): The number of bits looked up at once.
+            empty (str): The empty string, or b"" if the codes are for byte values.
+            table (list): For each value of the next table_bits bits, either
+                (characters, bit count) or (None, (subtable bits, subtable)),
+                or (None, None) if no code starts with those bits.
+                Subtable entries are (character, bits after the first table_bits).
+            max_length (int): The length of the longest code.
+            lookup (dict): The character of each (code length, code) pair.
+
+        Time Complexity:
+            O(2^b * s + k), where b is table_bits, s the most characters
+            decoded by one entry and k the number of unique characters.
+        """
+        self.table_bits = table_bits
+        codes = bit_codes(codes)
+        # Byte values, from bytes input, decode to bytes rather than str
+        self.empty = ""
+        if isinstance(next(iter(codes)), int):
+            self.empty = b""
+            codes = {bytes((byte,)): code for byte, code in codes.items()}
+        self.lookup = {(length, code): char for char, (code, length) in codes.items()}
+        self.max_length = max(length for _, length in codes.values())
+
+        # The first character of each value of the next table_bits bits
+        size = 1 << table_bits
+        mask = size - 1
+        first = [None] * size
+        long_codes = {}
+        for char, (code, length) in codes.items():
+            if length <= table_bits:
+                shift = table_bits - length
+                entry = (char, length)
+                for index in range(code << shift, (code + 1) << shift):
+                    first[index] = entry
+            else:
+                prefix = code >> (length - table_bits)
+                long_codes.setdefault(prefix, []).append((char, code, length))
+
+        self.table = [None] * size
+        for index in range(size):
+            if first[index] is None:
+                # Bits no code starts with only occur in a tree of one leaf
+                if index in long_codes:
+                    self.table[index] = (None, self._subtable(long_codes[index]))
+                else:
+                    self.table[index] = (None, None)
+                continue
+            chars = []
+            used = 0
+            entry = first[index]
+            # Keep decoding while the next code fits in the remaining bits
+            while entry is not None and used + entry[1] <= table_bits:
+                chars.append(entry[0])
+                used += entry[1]
+                entry = first[(index << used) & mask]
+            self.table[index] = (self.empty.join(chars), used)
+
+    def _subtable(self, codes: list) -> tuple:
+        """Return the bits and entries of the subtable for codes sharing their first table_bits bits."""
+        sub_bits = max(length for _, _, length in codes) - self.table_bits
+        subtable = [None] * (1 << sub_bits)
+        for char, code, length in codes:
+            rest = length - self.table_bits
+            code &= (1 << rest) - 1
+            shift = sub_bits - rest
+            for index in range(code << shift, (code + 1) << shift):
+                subtable[index] = (char, rest)
+        return sub_bits, subtable
+
+    def decode(self, data: bytes, bit_length: int) -> str:
+        """
+        Decode packed bytes from huffman_encoding(data, packed=True).
+
+        Bits are read into an integer accumulator 64 at a time, and while it
+        holds enough bits for the longest code, each step looks up the next
+        table_bits bits and takes all the characters they hold. The last bits
+        are decoded one at a time, since a table entry could read characters
+        from the padding.
+
+        Args:
+            data (bytes): The packed bits.
+            bit_length (int): The number of bits encoded in data.
+
+        Returns:
+            str: The decoded string, or bytes if the codes are for byte values.
+
+        Raises:
+            ValueError: If the data holds bits that no code starts with.
+
+        Time Complexity:
+            O(n + m), where n is bit_length and m the number of characters.
+            There is one lookup per table entry used, rather than one step per bit.
+        """
+        table = self.table
+        table_bits = self.table_bits
+        mask = (1 << table_bits) - 1
+        # Enough bits for the main table and any subtable
+        wanted = max(table_bits, self.max_length)
+        decoded_data = []
+        append = decoded_data.append
+        accumulator = 0
+        available = 0  # Bits of the accumulator not decoded yet
+        offset = 0  # Next byte of data to read
+        # The bytes before it hold no padding
+        whole_words = bit_length // 8 - 7
+
+        while offset < whole_words:
+            accumulator = (accumulator & ((1 << available) - 1)) << 64 | int.from_bytes(
+                data[offset : offset + 8], "big"
+            )
+            offset += 8
+            available += 64
+            while available >= wanted:
+                chars, used = table[(accumulator >> (available - table_bits)) & mask]
+                if chars is None:
+                    if used is None:
+                        position = offset * 8 - available
+                        raise ValueError(f"No Huffman code starts at bit {position}")
+                    sub_bits, subtable = used
+                    available -= table_bits
+                    index = accumulator >> (available - sub_bits)
+                    chars, used = subtable[index & ((1 << sub_bits) - 1)]
+                append(chars)
+                available -= used
+
+        # The undecoded bits of the accumulator, then the rest of the data
+        rest = data[offset:]
+        tail_bits = available + bit_length - offset * 8
+        tail = (accumulator & ((1 << available) - 1)) << 8 * len(rest)
+        tail = (tail | int.from_bytes(rest, "big")) >> (
+            available + 8 * len(rest) - tail_bits
+        )
+        code = 0
+        length = 0
+        for shift in range(tail_bits - 1, -1, -1):
+            code = code << 1 | (tail >> shift) & 1
+            length += 1
+            char = self.lookup.get((length, code))
+            if char is not None:
+                append(char)
+                code = 0
+                length = 0
+            elif length > self.max_length:
+                raise ValueError(f"No Huffman code ends at bit {bit_length - shift}")
+
+        return self.empty.join(decoded_data)
+
+
+# Marks the output of compress_stream, followed by b"t" for text or b"b" for bytes
+_STREAM_MAGIC = b"HUF"
+
+
+def compress_stream(
+    source, destination, chunk_size: int = 1 << 20, max_code_length: int = None
+) -> int:
+    """
+    Huffman encode a file object into another, holding one chunk in memory at a time.
+
+    The first pass counts characters chunk by chunk, then source is seeked
+    back to where it started. The second pass encodes chunk_size characters
+    at a time with canonical codes and writes each block as soon as it is
+    packed. Memory use depends on chunk_size, not on the size of the input.
+    Chunks of bytes are counted with byte_frequency() and packed with
+    pack_bytes().
+
+    The output is _STREAM_MAGIC, b"t" or b"b", the header length and the
+    header, then for each block the number of bits in it and its packed
+    bytes, and a bit count of 0 to end.
+
+    Args:
+        source: A seekable file object to read, in text or binary mode.
+        destination: A binary file object to write to.
+        chunk_size (int): The number of characters, or bytes, read at a time.
+        max_code_length (int): The longest code allowed, or None for no limit.
+
+    Returns:
+        int: The number of bytes written.
+
+    Time Complexity:
+        O(n log k), the same as huffman_encoding(), reading the input twice.
+    """
+    start = source.tell()
+    frequency = Counter()
+    text = True
+    while chunk := source.read(chunk_size):
+        text = isinstance(chunk, str)
+        frequency.update(chunk if text else byte_frequency(chunk))
+
+    lengths = huffman_code_lengths(frequency, max_code_length)
+    header = write_header(lengths)
+    preamble = bytearray(_STREAM_MAGIC + (b"t" if text else b"b"))
+    _write_varint(preamble, len(header))
+    written = destination.write(bytes(preamble) + header)
+
+    codes = bit_codes(canonical_codes(lengths))
+    pack = pack_bits if text else pack_bytes
+    source.seek(start)
+    while chunk := source.read(chunk_size):
+        encoded_bytes, bit_length = pack(chunk, codes)
+        block = bytearray()
+        _write_varint(block, bit_length)
+        written += destination.write(bytes(block))
+        written += destination.write(encoded_bytes)
+    written += destination.write(b"\x00")
+    return written
+
+
+def _read_stream_varint(source) -> int:
+    """Read an integer written by _write_varint from a binary file object."""
+    value = 0
+    shift = 0
+    while True:
+        byte = source.read(1)
+        if not byte:
+            raise ValueError("Huffman stream ended early")
+        value |= (byte[0] & 0x7F) << shift
+        if byte[0] < 0x80:
+            return value
+        shift += 7
+
+
+def decompress_stream(source, destination, table_bits: int = None) -> int:
+    """
+    Decode the output of compress_stream() block by block.
+
+    Only one block, and its decoded text, is held in memory at a time.
+
+    Args:
+        source: A binary file object to read.
+        destination: A file object to write to, in text mode if the input
+            was text and in binary mode if it was bytes.
+        table_bits (int): The width of the DecodeTable.
+
+    Returns:
+        int: The number of characters, or bytes, written.
+
+    Raises:
+        ValueError: If source does not hold the output of compress_stream().
+    """
+    magic = source.read(len(_STREAM_MAGIC) + 1)
+    if magic[:-1] != _STREAM_MAGIC or magic[-1:] not in (b"t", b"b"):
+        raise ValueError("Not a Huffman stream")
+    header = source.read(_read_stream_varint(source))
+    lengths, _ = read_header(header, text=magic[-1:] == b"t")
+
+    written = 0
+    decoder = None
+    while bit_length := _read_stream_varint(source):
+        if decoder is None:
+            codes = canonical_codes(lengths)
+            decoder = DecodeTable(codes, table_bits or _TABLE_BITS)
+        block = source.read((bit_length + 7) // 8)
+        written += destination.write(decoder.decode(block, bit_length))
+    return written
+
+
+# Marks the output of compress_blocks, followed by b"t" or b"b" and b"s" for a
+# shared codebook or b"p" for one per block
+_BLOCKS_MAGIC = b"HUB"
+
+
+def _encode_block(block, lengths: dict = None, max_code_length: int = None) -> bytes:
+    """
+    Encode one block, in a worker process.
+
+    Returns:
+        bytes: The block's own header if lengths is None, its bit count and its packed bits.
+    """
+    text = isinstance(block, str)
+    record = bytearray()
+    if lengths is None:
+        frequency = Counter(block) if text else byte_frequency(block)
+        lengths = huffman_code_lengths(frequency, max_code_length)
+        header = write_header(lengths)
+        _write_varint(record, len(header))
+        record += header
+    pack = pack_bits if text else pack_bytes
+    encoded_bytes, bit_length = pack(block, bit_codes(canonical_codes(lengths)))
+    _write_varint(record, bit_length)
+    record += encoded_bytes
+    return bytes(record)
+
+
+def _decode_block(record: bytes, lengths: dict, text: bool, table_bits: int):
+    """Decode one block written by _encode_block(), in a worker process."""
+    offset = 0
+    if lengths is None:
+        header_length, offset = _read_varint(record, offset)
+        lengths, _ = read_header(record[offset : offset + header_length], text=text)
+        offset += header_length
+    bit_length, offset = _read_varint(record, offset)
+    decoder = DecodeTable(canonical_codes(lengths), table_bits)
+    return decoder.decode(memoryview(record)[offset:], bit_length)
+
+
+def _map_blocks(function, workers: int, *iterables) -> list:
+    """Map function over the blocks in a pool of worker processes, or here if workers is 1."""
+    if workers == 1:
+        return list(map(function, *iterables))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(function, *iterables))
+
+
+def compress_blocks(
+    data,
+    block_size: int = 1 << 20,
+    workers: int = None,
+    shared: bool = True,
+    max_code_length: int = None,
+) -> bytes:
+    """
+    Huffman encode data as independent blocks, in a pool of worker processes.
+
+    Each block is packed on its own, so blocks are encoded, and later decoded,
+    in parallel. With shared, the characters are counted here first, which
+    runs at C speed and saves sending the blocks to the workers twice, and
+    every block is encoded with canonical codes from the totals.
+    Otherwise each block gets its own codes and header, which suits data
+    whose character frequencies change from block to block.
+
+    The output is _BLOCKS_MAGIC, b"t" or b"b", b"s" or b"p", the shared
+    header if there is one, the number of blocks, the size in bytes of each
+    block, and then the blocks. The block sizes give each block's offset, so
+    a decoder can hand them out without reading the blocks first.
+
+    Args:
+        data (str): The characters, or bytes, to encode.
+        block_size (int): The number of characters in each block.
+        workers (int): The number of worker processes, None for one per CPU,
+            or 1 to encode in this process.
+        shared (bool): Encode every block with the same codes.
+        max_code_length (int): The longest code allowed, or None for no limit.
+
+    Returns:
+        bytes: The encoded blocks.
+
+    Time Complexity:
+        O(n log k / w), where w is the number of workers, plus the cost of
+        sending the blocks to the workers and back.
+    """
+    text = isinstance(data, str)
+    if not text:
+        data = memoryview(data).cast("B")
+    blocks = [
+        data[start : start + block_size] for start in range(0, len(data), block_size)
+    ]
+    if not text:
+        # Slices of a memoryview are views, which cannot be pickled for the workers
+        blocks = list(map(bytes, blocks))
+    output = bytearray(
+        _BLOCKS_MAGIC + (b"t" if text else b"b") + (b"s" if shared else b"p")
+    )
+
+    lengths = [None] * len(blocks)
+    if shared:
+        frequency = Counter(data) if text else byte_frequency(data)
+        shared_lengths = huffman_code_lengths(frequency, max_code_length)
+        header = write_header(shared_lengths)
+        _write_varint(output, len(header))
+        output += header
+        lengths = [shared_lengths] * len(blocks)
+
+    limits = [max_code_length] * len(blocks)
+    records = _map_blocks(_encode_block, workers, blocks, lengths, limits)
+    _write_varint(output, len(records))
+    for record in records:
+        _write_varint(output, len(record))
+    for record in records:
+        output += record
+    return bytes(output)
+
+
+def decompress_blocks(payload: bytes, workers: int = None, table_bits: int = None):
+    """
+    Decode the output of compress_blocks(), one block per task in a pool of worker processes.
+
+    Args:
+        payload (bytes): The encoded blocks.
+        workers (int): The number of worker processes, None for one per CPU,
+            or 1 to decode in this process.
+        table_bits (int): The width of each block's DecodeTable.
+
+    Returns:
+        str: The decoded string, or bytes if bytes were encoded.
+
+    Raises:
+        ValueError: If payload is not the output of compress_blocks().
+    """
+    magic = payload[: len(_BLOCKS_MAGIC)]
+    text, shared = payload[len(magic) : len(magic) + 2]
+    if magic != _BLOCKS_MAGIC or text not in b"tb" or shared not in b"sp":
+        raise ValueError("Not Huffman blocks")
+    text = text == ord("t")
+    offset = len(magic) + 2
+
+    lengths = None
+    if shared == ord("s"):
+        header_length, offset = _read_varint(payload, offset)
+        lengths, _ = read_header(payload[offset : offset + header_length], text=text)
+        offset += header_length
+
+    count, offset = _read_varint(payload, offset)
+    sizes = []
+    for _ in range(count):
+        size, offset = _read_varint(payload, offset)
+        sizes.append(size)
+    records = []
+    for size in sizes:
+        records.append(payload[offset : offset + size])
+        offset += size
+
+    blocks = _map_blocks(
+        _decode_block,
+        workers,
+        records,
+        [lengths] * count,
+        [text] * count,
+        [table_bits or _TABLE_BITS] * count,
+    )
+    return ("" if text else b"").join(blocks)
+
+
 if __name__ == "__main__":
     codes = {}
 
@@ -214,16 +1195,12 @@ if __name__ == "__main__":
     print("The size of the data is: {}\n".format(sys.getsizeof(a_great_sentence)))
     print("The content of the data is: {}\n".format(a_great_sentence))
 
-    encoded_data, tree = huffman_encoding(a_great_sentence)
+    encoded_data, bit_length, tree = huffman_encoding(a_great_sentence, packed=True)
 
-    print(
-        "The size of the encoded data is: {}\n".format(
-            sys.getsizeof(int(encoded_data, base=2))
-        )
-    )
-    print("The content of the encoded data is: {}\n".format(encoded_data))
+    print("The size of the encoded data is: {}\n".format(sys.getsizeof(encoded_data)))
+    print("The content of the encoded data is: {}\n".format(encoded_data.hex()))
 
-    decoded_data = huffman_decoding(encoded_data, tree)
+    decoded_data = huffman_decoding(encoded_data, tree, bit_length)
 
     print("The size of the decoded data is: {}\n".format(sys.getsizeof(decoded_data)))
     print("The content of the encoded data is: {}\n".format(decoded_data))
@@ -1,4 +1,23 @@
-from src.problem_1 import LRU_Cache
+import asyncio
+import multiprocessing
+import os
+import random
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+import src.problem_1
+from src.problem_1 import (
+    FrequencySketch,
+    IntLRUCache,
+    LRU_Cache,
+    SharedLRUCache,
+    ShardedLRUCache,
+    WTinyLFUPolicy,
+    lru_memoize,
+)
 
 import pytest  # type: ignore
 
@@ -104,3 +123,1070 @@ def test_large_cache():
 
     large_cache.set(1001, 10010)
     assert large_cache.get(0) == -1
+
+
+# Weighted cache
+def test_eviction_count():
+    cache = LRU_Cache(2)
+    cache.set(1, 1)
+    cache.set(2, 2)
+    cache.set(1, 10)
+    assert cache.get_evictions() == 0
+    cache.set(3, 3)
+    assert cache.get_evictions() == 1
+
+
+def test_weighted_eviction_by_weight():
+    cache = LRU_Cache(10, max_weight=100)
+    cache.set(1, "a", weight=40)
+    cache.set(2, "b", weight=40)
+    cache.set(3, "c", weight=10)
+    assert cache.get_weight() == 90
+
+    cache.set(4, "d", weight=60)
+    # Both 1 and 2 have to go before the total fits again
+    assert cache.get(1) == -1
+    assert cache.get(2) == -1
+    assert cache.get(3) == "c"
+    assert cache.get(4) == "d"
+    assert cache.get_weight() == 70
+    assert cache.get_evictions() == 2
+
+
+def test_weighted_respects_recency():
+    cache = LRU_Cache(10, max_weight=30)
+    cache.set(1, 1, weight=10)
+    cache.set(2, 2, weight=10)
+    cache.set(3, 3, weight=10)
+    cache.get(1)
+    cache.set(4, 4, weight=10)
+    assert cache.get(2) == -1
+    assert cache.get(1) == 1
+
+
+def test_weighted_update_replaces_weight():
+    cache = LRU_Cache(10, max_weight=100)
+    cache.set(1, 1, weight=30)
+    cache.set(1, 2, weight=70)
+    assert cache.get_weight() == 70
+    assert cache.get(1) == 2
+
+
+def test_weighted_still_bounded_by_capacity():
+    cache = LRU_Cache(2, max_weight=1000)
+    cache.set(1, 1, weight=1)
+    cache.set(2, 2, weight=1)
+    cache.set(3, 3, weight=1)
+    assert cache.get(1) == -1
+    assert cache.get_weight() == 2
+
+
+def test_weighted_sizeof():
+    cache = LRU_Cache(10, max_weight=10, sizeof=len)
+    cache.set(1, b"12345")
+    cache.set(2, b"123456")
+    assert cache.get(1) == -1
+    assert cache.get_weight() == 6
+
+
+def test_weighted_entry_too_heavy():
+    cache = LRU_Cache(10, max_weight=10)
+    with pytest.raises(ValueError):
+        cache.set(1, 1, weight=11)
+    assert cache.get(1) == -1
+
+
+# Expiring cache
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.now
+
+
+def test_default_ttl_expires_on_get():
+    clock = FakeClock()
+    cache = LRU_Cache(5, ttl=10, clock=clock)
+    cache.set(1, 1)
+    clock.now = 9.9
+    assert cache.get(1) == 1
+    clock.now = 10
+    assert cache.get(1) == -1
+    assert cache.get_expirations() == 1
+    assert len(cache.cache) == 0
+
+
+def test_per_key_ttl_overrides_default():
+    clock = FakeClock()
+    cache = LRU_Cache(5, ttl=10, clock=clock)
+    cache.set(1, 1, ttl=100)
+    cache.set(2, 2)
+    clock.now = 50
+    assert cache.get(1) == 1
+    assert cache.get(2) == -1
+
+
+def test_set_without_ttl_clears_expiry():
+    clock = FakeClock()
+    cache = LRU_Cache(5, clock=clock)
+    cache.set(1, 1, ttl=5)
+    cache.set(1, 2)
+    clock.now = 100
+    assert cache.get(1) == 2
+
+
+def test_update_refreshes_ttl():
+    clock = FakeClock()
+    cache = LRU_Cache(5, ttl=10, clock=clock)
+    cache.set(1, 1)
+    clock.now = 8
+    cache.set(1, 2)
+    clock.now = 15
+    assert cache.get(1) == 2
+
+
+def test_sweep_frees_capacity_before_eviction():
+    clock = FakeClock()
+    cache = LRU_Cache(2, clock=clock)
+    cache.set(1, 1)
+    cache.set(2, 2, ttl=1)
+    clock.now = 5
+    cache.set(3, 3)
+    # The expired entry is swept, so the live entry 1 is not evicted
+    assert cache.get(1) == 1
+    assert cache.get(3) == 3
+    assert cache.get_evictions() == 0
+    assert cache.get_expirations() == 1
+
+
+def test_expiry_keeps_weight_in_sync():
+    clock = FakeClock()
+    cache = LRU_Cache(5, max_weight=100, ttl=1, clock=clock)
+    cache.set(1, 1, weight=60)
+    clock.now = 2
+    assert cache.get(1) == -1
+    assert cache.get_weight() == 0
+
+
+def test_sweep_is_amortised_constant():
+    clock = FakeClock()
+    n = 1000
+    cache = LRU_Cache(2 * n, ttl=1, clock=clock)
+    for i in range(n):
+        cache.set(i, i)
+    clock.now = 10
+
+    # Each set checks a bounded number of entries and calls the clock a
+    # bounded number of times, however many entries have expired
+    for i in range(n, 2 * n):
+        before = len(cache.cache)
+        calls = clock.calls
+        cache.set(i, i)
+        assert before + 1 - len(cache.cache) <= cache.sweep_batch
+        assert clock.calls - calls <= 2
+
+    # And the batches still add up to a full sweep of the stale entries
+    assert all(key not in cache.cache for key in range(n))
+    assert cache.get_expirations() == n
+
+
+# Loading cache
+def test_get_default():
+    cache = LRU_Cache(2)
+    cache.set(1, -1)
+    assert cache.get(1, None) == -1
+    assert cache.get(2, None) is None
+
+
+def test_get_or_load_caches_value():
+    cache = LRU_Cache(2)
+    calls = []
+
+    def loader(key):
+        calls.append(key)
+        return key * 10
+
+    assert cache.get_or_load(1, loader) == 10
+    assert cache.get_or_load(1, loader) == 10
+    assert calls == [1]
+    assert cache.get(1) == 10
+
+
+def test_get_or_load_caches_minus_one():
+    cache = LRU_Cache(2)
+    calls = []
+
+    def loader(key):
+        calls.append(key)
+        return -1
+
+    assert cache.get_or_load(1, loader) == -1
+    assert cache.get_or_load(1, loader) == -1
+    assert calls == [1]
+
+
+def test_get_or_load_single_flight():
+    cache = LRU_Cache(5)
+    calls = []
+    results = []
+    started = threading.Event()
+
+    def loader(key):
+        calls.append(key)
+        started.set()
+        time.sleep(0.1)
+        return "value"
+
+    def worker():
+        results.append(cache.get_or_load(1, loader))
+
+    leader = threading.Thread(target=worker)
+    leader.start()
+    started.wait()
+    waiters = [threading.Thread(target=worker) for _ in range(7)]
+    for thread in waiters:
+        thread.start()
+    for thread in [leader] + waiters:
+        thread.join()
+
+    assert calls == [1]
+    assert results == ["value"] * 8
+    assert cache.loads == {}
+
+
+def test_get_or_load_exception_reaches_waiters_and_is_not_cached():
+    cache = LRU_Cache(5)
+    errors = []
+    started = threading.Event()
+
+    def failing_loader(key):
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError("backend down")
+
+    def worker():
+        try:
+            cache.get_or_load(1, failing_loader)
+        except RuntimeError as exc:
+            errors.append(exc)
+
+    leader = threading.Thread(target=worker)
+    leader.start()
+    started.wait()
+    waiters = [threading.Thread(target=worker) for _ in range(3)]
+    for thread in waiters:
+        thread.start()
+    for thread in [leader] + waiters:
+        thread.join()
+
+    assert len(errors) == 4
+    assert cache.get(1) == -1
+    assert cache.get_or_load(1, lambda key: "recovered") == "recovered"
+
+
+def test_get_or_load_async_single_flight():
+    cache = LRU_Cache(5)
+    calls = []
+
+    async def loader(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return key + 1
+
+    async def main():
+        return await asyncio.gather(
+            *(cache.get_or_load_async(1, loader) for _ in range(10))
+        )
+
+    assert asyncio.run(main()) == [2] * 10
+    assert calls == [1]
+    assert cache.get(1) == 2
+    assert cache.async_loads == {}
+
+
+def test_get_or_load_async_exception():
+    cache = LRU_Cache(5)
+    calls = []
+
+    async def loader(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        raise KeyError(key)
+
+    async def main():
+        return await asyncio.gather(
+            *(cache.get_or_load_async(1, loader) for _ in range(5)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, KeyError) for result in results)
+    assert calls == [1]
+    assert cache.get(1) == -1
+
+
+def test_get_or_load_async_waiter_cancel_keeps_load():
+    cache = LRU_Cache(5)
+
+    async def loader(key):
+        await asyncio.sleep(0.02)
+        return "value"
+
+    async def main():
+        leader = asyncio.ensure_future(cache.get_or_load_async(1, loader))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(cache.get_or_load_async(1, loader))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        return await leader
+
+    assert asyncio.run(main()) == "value"
+    assert cache.get(1) == "value"
+
+
+# Eviction policies
+def _replay(cache, keys):
+    hits = 0
+    for key in keys:
+        if cache.get(key, None) is None:
+            cache.set(key, key)
+        else:
+            hits += 1
+    return hits
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        LRU_Cache(5, policy="fifo")
+
+
+def test_tinylfu_policy_by_name():
+    cache = LRU_Cache(5, policy="tinylfu")
+    assert isinstance(cache.policy, WTinyLFUPolicy)
+
+
+def test_tinylfu_get_set():
+    cache = LRU_Cache(5, policy="tinylfu")
+    for i in range(5):
+        cache.set(i, i * 10)
+    assert [cache.get(i) for i in range(5)] == [0, 10, 20, 30, 40]
+    cache.set(9, 90)
+    assert len(cache.cache) == 5
+    assert cache.get_evictions() == 1
+
+
+def test_tinylfu_resists_scan():
+    # Every round reads the hot keys, then scans 200 keys never seen before
+    trace = []
+    for round in range(20):
+        trace.extend(range(50))
+        trace.extend(range(1000 + round * 200, 1200 + round * 200))
+
+    lru = LRU_Cache(100)
+    tinylfu = LRU_Cache(100, policy="tinylfu")
+    for cache in (lru, tinylfu):
+        _replay(cache, trace)
+
+    assert _replay(lru, range(50)) == 0
+    assert _replay(tinylfu, range(50)) >= 45
+
+
+def test_tinylfu_tracks_removed_keys():
+    clock = FakeClock()
+    cache = LRU_Cache(3, policy="tinylfu", ttl=1, clock=clock)
+    cache.set(1, 1)
+    clock.now = 2
+    assert cache.get(1) == -1
+    for i in range(2, 10):
+        cache.set(i, i)
+    policy = cache.policy
+    tracked = list(policy.window) + list(policy.probation) + list(policy.protected)
+    assert sorted(tracked) == sorted(cache.cache)
+
+
+def test_tinylfu_weighted():
+    cache = LRU_Cache(10, max_weight=30, policy="tinylfu")
+    for i in range(10):
+        cache.set(i, i, weight=10)
+    assert cache.get_weight() <= 30
+    assert len(cache.cache) == 3
+
+
+def test_tinylfu_weighted_keeps_entry_being_set():
+    clock = FakeClock()
+    cache = LRU_Cache(3, max_weight=20, policy="tinylfu", ttl=5, clock=clock)
+    for key, weight in [(2, 4), (3, 12), (1, 9), (2, 14)]:
+        cache.set(key, key, weight=weight)
+    assert cache.get(2) == 2
+    assert cache.get_weight() <= 20
+    clock.now += 10
+    cache.set(4, 4, weight=1)
+    assert list(cache.cache) == [4]
+
+
+def test_frequency_sketch():
+    sketch = FrequencySketch(64)
+    for _ in range(5):
+        sketch.increment("a")
+    sketch.increment("b")
+    assert sketch.frequency("a") >= 5
+    assert sketch.frequency("b") >= 1
+    assert sketch.frequency("a") > sketch.frequency("b")
+
+
+def test_frequency_sketch_ages():
+    sketch = FrequencySketch(16)
+    for _ in range(10):
+        sketch.increment("a")
+    for i in range(sketch.sample_size):
+        sketch.increment(("filler", i))
+    assert sketch.frequency("a") < 10
+
+
+# Bulk operations
+def test_get_many(filled_cache):
+    assert filled_cache.get_many([1, 3, 9]) == {1: 1, 3: 3}
+
+
+def test_get_many_updates_recency(filled_cache):
+    filled_cache.get_many([1, 2])
+    filled_cache.set(5, 5)
+    filled_cache.set(6, 6)
+    assert filled_cache.get(3) == -1
+    assert filled_cache.get(1) == 1
+
+
+def test_set_many_matches_set_loop():
+    batched = LRU_Cache(5)
+    looped = LRU_Cache(5)
+    for cache in (batched, looped):
+        cache.set(1, 1)
+        cache.set(2, 2)
+        cache.set(3, 3)
+    mapping = {2: 20, 4: 4, 5: 5, 6: 6, 7: 7}
+    batched.set_many(mapping)
+    for key, value in mapping.items():
+        looped.set(key, value)
+    assert list(batched.cache.items()) == list(looped.cache.items())
+    assert batched.get_evictions() == looped.get_evictions() == 2
+
+
+def test_set_many_larger_than_capacity():
+    cache = LRU_Cache(3)
+    cache.set_many({i: i for i in range(10)})
+    assert list(cache.cache) == [7, 8, 9]
+
+
+def test_set_many_with_ttl():
+    clock = FakeClock()
+    cache = LRU_Cache(5, clock=clock)
+    cache.set_many({1: 1, 2: 2}, ttl=5)
+    clock.now = 6
+    assert cache.get_many([1, 2]) == {}
+
+
+def test_get_many_tinylfu():
+    cache = LRU_Cache(5, policy="tinylfu")
+    cache.set_many({1: 1, 2: 2})
+    assert cache.get_many([1, 2, 3]) == {1: 1, 2: 2}
+
+
+def test_delete(filled_cache):
+    assert filled_cache.delete(1) is True
+    assert filled_cache.delete(1) is False
+    assert filled_cache.get(1) == -1
+
+
+def test_pop():
+    cache = LRU_Cache(5, max_weight=100)
+    cache.set(1, "one", weight=30)
+    assert cache.pop(1) == "one"
+    assert cache.pop(1) == -1
+    assert cache.pop(1, None) is None
+    assert cache.get_weight() == 0
+
+
+def test_pop_expired():
+    clock = FakeClock()
+    cache = LRU_Cache(5, ttl=1, clock=clock)
+    cache.set(1, 1)
+    clock.now = 2
+    assert cache.pop(1) == -1
+    assert len(cache.cache) == 0
+    assert cache.get_expirations() == 1
+
+
+def test_clear():
+    cache = LRU_Cache(5, max_weight=100, policy="tinylfu")
+    cache.set(1, 1, weight=10)
+    cache.set(2, 2, weight=10, ttl=5)
+    cache.clear()
+    assert cache.get(1) == -1
+    assert cache.get_weight() == 0
+    assert not cache.expires
+    assert not cache.policy.window
+
+
+# Statistics
+def test_stats_disabled_by_default(empty_cache):
+    assert empty_cache.stats is None
+    assert "get" not in vars(empty_cache)
+
+
+def test_stats_counters():
+    cache = LRU_Cache(2, stats=True)
+    cache.set(1, 1)
+    cache.set(2, 2)
+    cache.set(1, 10)
+    cache.get(1)
+    cache.get(9)
+    cache.set(3, 3)
+
+    snapshot = cache.stats.snapshot()
+    assert snapshot["hits"] == 1
+    assert snapshot["misses"] == 1
+    assert snapshot["hit_ratio"] == 0.5
+    assert snapshot["inserts"] == 3
+    assert snapshot["updates"] == 1
+    assert snapshot["evictions"] == 1
+    assert snapshot["size"] == 2
+
+
+def test_stats_bulk_counters():
+    cache = LRU_Cache(5, stats=True)
+    cache.set_many({1: 1, 2: 2})
+    cache.set_many({2: 20, 3: 3})
+    assert cache.get_many([1, 2, 7]) == {1: 1, 2: 20}
+    assert cache.get_many([3, 3, 8, 8]) == {3: 3}
+
+    snapshot = cache.stats.snapshot()
+    assert snapshot["inserts"] == 3
+    assert snapshot["updates"] == 1
+    assert snapshot["hits"] == 4
+    assert snapshot["misses"] == 3
+
+
+def test_stats_get_keeps_minus_one_default():
+    cache = LRU_Cache(2, stats=True)
+    cache.set(1, -1)
+    assert cache.get(1) == -1
+    assert cache.get(2) == -1
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 1
+
+
+def test_stats_latency_sampling():
+    cache = LRU_Cache(10, stats=True)
+    cache.stats.sample_every = 1
+    for i in range(20):
+        cache.set(i, i)
+        cache.get(i)
+
+    latency = cache.stats.snapshot()["latency_ns"]
+    assert sum(latency["get"].values()) == 20
+    assert sum(latency["set"].values()) == 20
+    assert all(bound & (bound - 1) == 0 for bound in latency["get"])
+
+
+def test_stats_reset():
+    cache = LRU_Cache(1, stats=True)
+    cache.set(1, 1)
+    cache.set(2, 2)
+    cache.get(2)
+    cache.stats.reset()
+
+    snapshot = cache.stats.snapshot()
+    assert snapshot["hits"] == 0
+    assert snapshot["inserts"] == 0
+    assert snapshot["evictions"] == 0
+    assert snapshot["size"] == 1
+    assert snapshot["latency_ns"] == {"get": {}, "set": {}}
+
+
+def test_on_evict_callback():
+    evicted = []
+    cache = LRU_Cache(2, on_evict=lambda key, value: evicted.append((key, value)))
+    cache.set(1, "a")
+    cache.set(2, "b")
+    cache.set(3, "c")
+    cache.delete(2)
+    assert evicted == [(1, "a")]
+
+
+def test_on_evict_callback_with_policy():
+    evicted = []
+    cache = LRU_Cache(
+        2, policy="tinylfu", on_evict=lambda key, value: evicted.append(key)
+    )
+    for i in range(5):
+        cache.set(i, i)
+    assert len(evicted) == 3
+    assert not set(evicted) & set(cache.cache)
+
+
+# Memoization
+def test_memoize_caches_results():
+    calls = []
+
+    @lru_memoize(capacity=2)
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    assert square(3) == 9
+    assert square(3) == 9
+    assert calls == [3]
+    assert square.cache_info() == (1, 1, 2, 1)
+    assert square.__name__ == "square"
+
+
+def test_memoize_minus_one_result():
+    calls = []
+
+    @lru_memoize()
+    def minus_one(x):
+        calls.append(x)
+        return -1
+
+    assert minus_one(1) == -1
+    assert minus_one(1) == -1
+    assert calls == [1]
+    assert minus_one.cache_info().hits == 1
+
+
+def test_memoize_evicts_least_recently_used():
+    calls = []
+
+    @lru_memoize(capacity=2)
+    def identity(x):
+        calls.append(x)
+        return x
+
+    identity(1)
+    identity(2)
+    identity(1)
+    identity(3)
+    identity(2)
+    assert calls == [1, 2, 3, 2]
+
+
+def test_memoize_keyword_arguments():
+    calls = []
+
+    @lru_memoize()
+    def add(a, b=0):
+        calls.append((a, b))
+        return a + b
+
+    assert add(1, b=2) == 3
+    assert add(1, b=2) == 3
+    assert add(1, 2) == 3
+    assert add(1) == 1
+    assert len(calls) == 3
+
+
+def test_memoize_typed():
+    untyped_calls = []
+    typed_calls = []
+
+    @lru_memoize()
+    def untyped(x, y):
+        untyped_calls.append(x)
+        return x + y
+
+    @lru_memoize(typed=True)
+    def typed(x, y):
+        typed_calls.append(x)
+        return x + y
+
+    for func in (untyped, typed):
+        func(1, 1)
+        func(1.0, 1)
+    assert len(untyped_calls) == 1
+    assert len(typed_calls) == 2
+
+
+def test_memoize_cache_clear():
+    @lru_memoize()
+    def double(x):
+        return 2 * x
+
+    double(1)
+    double(1)
+    double.cache_clear()
+    assert double.cache_info() == (0, 0, 128, 0)
+
+
+def test_memoize_cache_options():
+    clock = FakeClock()
+    calls = []
+
+    @lru_memoize(ttl=10, clock=clock, stats=True)
+    def load(x):
+        calls.append(x)
+        return x
+
+    load(1)
+    clock.now = 20
+    load(1)
+    assert calls == [1, 1]
+    assert load.cache.stats.snapshot()["misses"] == 2
+
+
+# Snapshots
+def test_dump_load_keeps_order(tmp_path, overfilled_cache_with_eviction_3):
+    path = tmp_path / "cache.bin"
+    overfilled_cache_with_eviction_3.dump(path)
+
+    restored = LRU_Cache(5)
+    restored.load(path)
+    assert list(restored.cache.items()) == list(
+        overfilled_cache_with_eviction_3.cache.items()
+    )
+
+
+def test_dump_int_pairs_are_little_endian(tmp_path, monkeypatch):
+    path = tmp_path / "cache.bin"
+    cache = LRU_Cache(5)
+    cache.set(1, -2)
+    cache.dump(path)
+    assert path.read_bytes().endswith(struct.pack("<qq", 1, -2))
+
+    # A big-endian host swaps the pairs when writing and when reading
+    monkeypatch.setattr(sys, "byteorder", "big")
+    cache.dump(path)
+    assert path.read_bytes().endswith(struct.pack(">qq", 1, -2))
+    restored = LRU_Cache(5)
+    restored.load(path)
+    assert list(restored.cache.items()) == [(1, -2)]
+
+
+def test_dump_load_tinylfu_starts_afresh(tmp_path):
+    path = tmp_path / "cache.bin"
+    cache = LRU_Cache(5, policy="tinylfu")
+    for i in range(6):
+        cache.set(i, i)
+    for key in list(cache.policy.probation):
+        cache.get(key)
+    assert cache.policy.protected
+    cache.dump(path)
+
+    restored = LRU_Cache(5, policy="tinylfu")
+    restored.load(path)
+    assert dict(restored.cache) == dict(cache.cache)
+    assert not restored.policy.protected
+
+
+def test_dump_load_many_chunks(tmp_path):
+    cache = LRU_Cache(10_000)
+    for i in range(10_000):
+        cache.set(i, -i)
+    cache.get(0)
+    path = tmp_path / "cache.bin"
+    cache.dump(path)
+    # Raw int64 pairs plus the magic and one header per chunk
+    assert path.stat().st_size < 10_000 * 16 + 100
+
+    restored = LRU_Cache(10_000)
+    restored.load(path)
+    assert list(restored.cache.items()) == list(cache.cache.items())
+
+
+def test_dump_load_mixed_values(tmp_path):
+    cache = LRU_Cache(5)
+    cache.set(1, "one")
+    cache.set("two", [2])
+    cache.set(3, 1 << 70)
+    cache.set(4, True)
+    path = tmp_path / "cache.bin"
+    cache.dump(path)
+
+    restored = LRU_Cache(5)
+    restored.set(9, 9)
+    restored.load(path)
+    assert list(restored.cache.items()) == list(cache.cache.items())
+    assert restored.get(4) is True
+
+
+def test_load_into_smaller_cache(tmp_path, filled_cache):
+    path = tmp_path / "cache.bin"
+    filled_cache.dump(path)
+    restored = LRU_Cache(2)
+    restored.load(path)
+    assert list(restored.cache) == [3, 4]
+
+
+def test_dump_load_weights_and_ttl(tmp_path):
+    clock = FakeClock()
+    cache = LRU_Cache(5, max_weight=100, clock=clock)
+    cache.set(1, "a", weight=30, ttl=10)
+    cache.set(2, "b", weight=20, ttl=1)
+    cache.set(3, "c", weight=10)
+    clock.now = 5
+    path = tmp_path / "cache.bin"
+    cache.dump(path)
+
+    restored = LRU_Cache(5, max_weight=100, clock=clock)
+    restored.load(path)
+    assert list(restored.cache) == [1, 3]
+    assert restored.get_weight() == 40
+    clock.now = 10.5
+    assert restored.get(1) == -1
+    assert restored.get(3) == "c"
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"not a snapshot")
+    with pytest.raises(ValueError):
+        LRU_Cache(5).load(path)
+
+
+# Sharded cache
+def test_sharded_capacity():
+    cache = ShardedLRUCache(10, shards=4)
+    assert cache.get_capacity() == 10
+    assert sum(shard.get_capacity() for shard in cache.shards) == 10
+
+
+def test_sharded_more_shards_than_capacity():
+    cache = ShardedLRUCache(3, shards=8)
+    assert len(cache.shards) == 3
+    for i in range(3):
+        cache.set(i, i)
+    assert [cache.get(i) for i in range(3)] == [0, 1, 2]
+
+
+def test_sharded_invalid_arguments():
+    with pytest.raises(ValueError):
+        ShardedLRUCache(0)
+    with pytest.raises(ValueError):
+        ShardedLRUCache(5, shards=0)
+
+
+def test_sharded_get_set():
+    cache = ShardedLRUCache(8, shards=2)
+    cache.set(1, 10)
+    cache.set(2, 20)
+    assert cache.get(1) == 10
+    assert cache.get(2) == 20
+    assert cache.get(3) == -1
+
+
+def test_sharded_eviction_is_per_shard():
+    # Even keys land on shard 0 and odd keys on shard 1
+    cache = ShardedLRUCache(4, shards=2)
+    cache.set(0, 0)
+    cache.set(2, 2)
+    cache.set(1, 1)
+    cache.get(0)
+    cache.set(4, 4)
+    assert cache.get(2) == -1
+    assert cache.get(0) == 0
+    assert cache.get(1) == 1
+
+
+def test_sharded_concurrent_access():
+    cache = ShardedLRUCache(100, shards=4)
+    errors = []
+
+    def worker(offset):
+        try:
+            for i in range(2000):
+                key = (i + offset) % 150
+                cache.set(key, key)
+                value = cache.get(key)
+                assert value in (key, -1)
+        except Exception as exc:  # pragma: no cover - surfaced below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sum(len(shard.cache) for shard in cache.shards) <= 100
+
+
+# Shared memory cache
+@pytest.fixture
+def shared_cache():
+    cache = SharedLRUCache(5, value_size=16)
+    yield cache
+    cache.close()
+    cache.unlink()
+
+
+def _shared_worker(cache, offset):
+    for i in range(200):
+        cache.set(offset + i, offset + i)
+        cache.get(offset + (i // 2))
+
+
+def test_shared_get_set(shared_cache):
+    shared_cache.set(1, 1)
+    shared_cache.set(2, b"two")
+    assert shared_cache.get(1) == 1
+    assert shared_cache.get(2) == b"two"
+    assert shared_cache.get(9) == -1
+    assert shared_cache.get_capacity() == 5
+
+
+def test_shared_matches_lru_cache(shared_cache):
+    reference = LRU_Cache(5)
+    rng = random.Random(0)
+    for _ in range(2000):
+        key = rng.randrange(12)
+        if rng.random() < 0.5:
+            shared_cache.set(key, key * 3)
+            reference.set(key, key * 3)
+        else:
+            assert shared_cache.get(key) == reference.get(key)
+    assert shared_cache.keys() == list(reference.cache)
+    assert len(shared_cache) == 5
+
+
+def test_shared_invalid_values(shared_cache):
+    with pytest.raises(ValueError):
+        shared_cache.set(1, b"x" * 17)
+    with pytest.raises(ValueError):
+        shared_cache.set(1, 1 << 63)
+    with pytest.raises(TypeError):
+        shared_cache.set("a", 1)
+    with pytest.raises(TypeError):
+        shared_cache.set(1, "text")
+    assert len(shared_cache) == 0
+
+
+def test_shared_attach(shared_cache):
+    shared_cache.set(1, b"one")
+    other = SharedLRUCache.attach(shared_cache.name, shared_cache.lock)
+    assert other.get(1) == b"one"
+    other.set(2, 2)
+    assert shared_cache.get(2) == 2
+    other.close()
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(),
+    reason="needs the fork start method",
+)
+@pytest.mark.parametrize("named_lock", [False, True])
+def test_shared_across_processes(named_lock):
+    if named_lock and src.problem_1.fcntl is None:
+        pytest.skip("needs fcntl")
+    cache = SharedLRUCache(1000, named_lock=named_lock)
+    try:
+        context = multiprocessing.get_context("fork")
+        workers = [
+            context.Process(target=_shared_worker, args=(cache, n * 1000))
+            for n in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+            assert worker.exitcode == 0
+
+        keys = cache.keys()
+        assert len(keys) == len(cache) == 800
+        assert all(cache.get(key) == key for key in keys)
+    finally:
+        cache.close()
+        cache.unlink()
+
+
+def test_shared_outlives_attached_process():
+    # An unrelated process, with its own resource tracker, attaches and exits
+    if src.problem_1.fcntl is None:
+        pytest.skip("needs fcntl")
+    cache = SharedLRUCache(10, named_lock=True)
+    script = (
+        "import sys\n"
+        "from src.problem_1 import SharedLRUCache\n"
+        "other = SharedLRUCache.attach(sys.argv[1])\n"
+        "other.set(1, b'one')\n"
+        "other.close()\n"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        # Waits for the tracker too, which holds on to the stderr pipe
+        result = subprocess.run(
+            [sys.executable, "-c", script, cache.name],
+            cwd=root,
+            capture_output=True,
+            text=True,
+        )
+        assert result.returncode == 0, result.stderr
+        assert "leaked" not in result.stderr
+
+        other = SharedLRUCache.attach(cache.name)
+        assert other.get(1) == b"one"
+        other.close()
+    finally:
+        cache.close()
+        cache.unlink()
+    assert not os.path.exists(cache.lock.path)
+
+
+def test_shared_attach_needs_lock(shared_cache):
+    # A multiprocessing lock can only be handed to the processes it starts
+    with pytest.raises(ValueError):
+        SharedLRUCache.attach(shared_cache.name)
+
+
+# Array backed int cache
+def test_int_cache_get_set():
+    cache = IntLRUCache(5)
+    assert cache.get_capacity() == 5
+    cache.set(1, 10)
+    cache.set(-2, -20)
+    assert cache.get(1) == 10
+    assert cache.get(-2) == -20
+    assert cache.get(3) == -1
+    assert cache.get("1") == -1
+
+
+def test_int_cache_eviction(overfilled_cache_with_eviction_3):
+    cache = IntLRUCache(5)
+    for key in (1, 2, 3, 4):
+        cache.set(key, key)
+    cache.get(1)
+    cache.get(2)
+    cache.set(5, 5)
+    cache.set(6, 6)
+    assert cache.get(3) == -1
+    assert cache.keys() == list(overfilled_cache_with_eviction_3.cache)
+
+
+@pytest.mark.parametrize("capacity", [1, 2, 7, 100])
+def test_int_cache_matches_lru_cache(capacity):
+    cache = IntLRUCache(capacity)
+    reference = LRU_Cache(capacity)
+    rng = random.Random(capacity)
+    for _ in range(5000):
+        key = rng.randrange(-capacity, 2 * capacity + 3)
+        if rng.random() < 0.5:
+            cache.set(key, key * 3)
+            reference.set(key, key * 3)
+        else:
+            assert cache.get(key) == reference.get(key)
+    assert cache.keys() == list(reference.cache)
+    assert len(cache) == len(reference.cache)
+
+
+def test_int_cache_invalid_items():
+    cache = IntLRUCache(2)
+    cache.set(1, 1)
+    cache.set(2, 2)
+    with pytest.raises(TypeError):
+        cache.set(3, "3")
+    with pytest.raises(OverflowError):
+        cache.set(1 << 63, 3)
+    # Nothing was evicted by the rejected calls
+    assert cache.keys() == [1, 2]
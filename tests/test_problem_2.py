@@ -1,4 +1,23 @@
-from src.problem_2 import find_files
+import asyncio
+import contextlib
+import os
+import sys
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest  # type: ignore
+
+import src.problem_2
+from src.problem_2 import (
+    FileIndex,
+    PatternMatcher,
+    async_find_files,
+    find_files,
+    iter_files,
+    match_files,
+)
 
 
 def test_empty_directory():
@@ -11,3 +30,536 @@ def test_subdir5():
     subdir5 = "src/testdir/subdir5"
     result = find_files(".c", subdir5)
     assert result == ["src/testdir/subdir5/a.c"]
+
+
+@pytest.fixture
+def wide_tree(tmp_path):
+    for i in range(6):
+        for j in range(4):
+            directory = tmp_path / f"d{i}" / f"e{j}"
+            directory.mkdir(parents=True)
+            (directory / f"{i}{j}.c").write_text("")
+            (directory / f"{i}{j}.h").write_text("")
+        (tmp_path / f"d{i}" / f"{i}.c").write_text("")
+    return str(tmp_path)
+
+
+def test_whole_testdir():
+    result = find_files(".c", "src/testdir")
+    assert sorted(result) == [
+        "src/testdir/subdir1/a.c",
+        "src/testdir/subdir3/subsubdir1/b.c",
+        "src/testdir/subdir5/a.c",
+        "src/testdir/t1.c",
+    ]
+
+
+def test_iter_files_is_lazy():
+    files = iter_files(".h", "src/testdir")
+    assert not isinstance(files, list)
+    assert next(files).endswith(".h")
+
+
+def test_iter_files_matches_find_files():
+    assert list(iter_files(".h", "src/testdir")) == find_files(".h", "src/testdir")
+
+
+def test_deeper_than_recursion_limit(tmp_path):
+    depth = sys.getrecursionlimit() + 100
+    directory = tmp_path
+    for _ in range(depth):
+        directory = directory / "d"
+        directory.mkdir()
+    (directory / "deep.c").write_text("")
+    try:
+        assert find_files(".c", str(tmp_path)) == [str(directory / "deep.c")]
+    finally:
+        # shutil.rmtree, which cleans up tmp_path, recurses as well
+        (directory / "deep.c").unlink()
+        while directory != tmp_path:
+            directory.rmdir()
+            directory = directory.parent
+
+
+def test_permission_denied_directory(tmp_path, capsys):
+    locked = tmp_path / "locked"
+    locked.mkdir()
+    (tmp_path / "open.c").write_text("")
+    os.chmod(locked, 0)
+    try:
+        if os.access(locked, os.R_OK):
+            pytest.skip("permissions are not enforced for this user")
+        assert find_files(".c", str(tmp_path)) == [str(tmp_path / "open.c")]
+        assert "Permission denied" in capsys.readouterr().out
+    finally:
+        os.chmod(locked, 0o755)
+
+
+@pytest.mark.parametrize("workers", [2, 4])
+def test_parallel_ordered_matches_sequential(wide_tree, workers):
+    expected = find_files(".c", wide_tree)
+    assert len(expected) == 30
+    assert find_files(".c", wide_tree, workers=workers) == expected
+
+
+@pytest.fixture
+def submitted(monkeypatch):
+    # The directories submitted to the thread pool, in order
+    paths = []
+
+    class RecordingExecutor(ThreadPoolExecutor):
+        def submit(self, function, *args):
+            paths.append(args[-1][0])
+            return super().submit(function, *args)
+
+    monkeypatch.setattr(src.problem_2, "ThreadPoolExecutor", RecordingExecutor)
+    return paths
+
+
+def test_parallel_ordered_scans_ahead_in_order(tmp_path, submitted):
+    for i in range(20):
+        (tmp_path / f"d{i:02}").mkdir()
+        (tmp_path / f"d{i:02}" / "a.c").write_text("")
+    expected = find_files(".c", str(tmp_path))
+    files = iter_files(".c", str(tmp_path), workers=2)
+    assert next(files) == expected[0]
+    # The root, then the next directories to read, up to the limit
+    directories = [os.path.dirname(path) for path in expected]
+    limit = 2 * src.problem_2._SCAN_AHEAD
+    assert submitted == [str(tmp_path)] + directories[:limit]
+    assert [expected[0]] + list(files) == expected
+
+
+def test_parallel_unordered(wide_tree):
+    expected = find_files(".c", wide_tree)
+    result = find_files(".c", wide_tree, workers=4, ordered=False)
+    assert sorted(result) == sorted(expected)
+
+
+def test_parallel_testdir():
+    assert find_files(".c", "src/testdir", workers=3) == find_files(".c", "src/testdir")
+    assert find_files(".c", "src/testdir/subdir2", workers=3) == []
+
+
+def test_parallel_stops_early(wide_tree):
+    files = iter_files(".c", wide_tree, workers=4)
+    first = next(files)
+    files.close()
+    assert first.endswith(".c")
+
+
+def test_parallel_permission_denied(wide_tree, capsys):
+    locked = os.path.join(wide_tree, "d0")
+    os.chmod(locked, 0)
+    try:
+        if os.access(locked, os.R_OK):
+            pytest.skip("permissions are not enforced for this user")
+        result = find_files(".c", wide_tree, workers=4, ordered=False)
+        assert len(result) == 25
+        assert f"Permission denied: {locked}" in capsys.readouterr().out
+    finally:
+        os.chmod(locked, 0o755)
+
+
+@pytest.fixture
+def count_scans(monkeypatch):
+    scanned = []
+    scandir = os.scandir
+
+    def counting_scandir(path):
+        scanned.append(path)
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", counting_scandir)
+    return scanned
+
+
+@pytest.fixture
+def settled_index():
+    index = FileIndex()
+    # Trust every mtime, the tests change them explicitly
+    index.mtime_granularity_ns = 0
+    return index
+
+
+def test_index_matches_find_files(wide_tree, settled_index):
+    expected = find_files(".c", wide_tree)
+    assert find_files(".c", wide_tree, index=settled_index) == expected
+    assert find_files(".h", wide_tree, index=settled_index) == find_files(
+        ".h", wide_tree
+    )
+
+
+def test_index_warm_query_does_not_scan(wide_tree, settled_index, count_scans):
+    first = list(settled_index.iter_files(".c", wide_tree))
+    scans = len(count_scans)
+    assert list(settled_index.iter_files(".c", wide_tree)) == first
+    assert len(count_scans) == scans
+
+
+def test_index_rescans_changed_directory(wide_tree, settled_index, count_scans):
+    list(settled_index.iter_files(".c", wide_tree))
+    changed = os.path.join(wide_tree, "d2", "e1")
+    open(os.path.join(changed, "new.c"), "w").close()
+    os.utime(changed, ns=(0, os.stat(changed).st_mtime_ns + 1))
+    del count_scans[:]
+
+    result = list(settled_index.iter_files(".c", wide_tree))
+    assert count_scans == [changed]
+    assert os.path.join(changed, "new.c") in result
+
+
+def test_index_forgets_removed_directory(wide_tree, settled_index):
+    list(settled_index.iter_files(".c", wide_tree))
+    removed = os.path.join(wide_tree, "d3", "e0")
+    for name in os.listdir(removed):
+        os.unlink(os.path.join(removed, name))
+    os.rmdir(removed)
+    parent = os.path.dirname(removed)
+    os.utime(parent, ns=(0, os.stat(parent).st_mtime_ns + 1))
+
+    result = list(settled_index.iter_files(".c", wide_tree))
+    assert removed not in settled_index.directories
+    assert not any(path.startswith(removed) for path in result)
+
+
+def test_index_save_and_load(tmp_path_factory, wide_tree, count_scans):
+    # Saved outside the tree, which would otherwise change its mtime
+    path = str(tmp_path_factory.mktemp("index") / "index.json")
+    index = FileIndex(path)
+    index.mtime_granularity_ns = 0
+    expected = list(index.iter_files(".c", wide_tree))
+    index.save()
+    del count_scans[:]
+
+    loaded = FileIndex(path)
+    loaded.mtime_granularity_ns = 0
+    assert list(loaded.iter_files(".c", wide_tree)) == expected
+    assert count_scans == []
+
+
+def test_index_invalidate(wide_tree, settled_index, count_scans):
+    list(settled_index.iter_files(".c", wide_tree))
+    subtree = os.path.join(wide_tree, "d1")
+    settled_index.invalidate(subtree)
+    del count_scans[:]
+    list(settled_index.iter_files(".c", wide_tree))
+    assert sorted(count_scans) == sorted(
+        [subtree] + [os.path.join(subtree, f"e{j}") for j in range(4)]
+    )
+
+    settled_index.invalidate()
+    assert settled_index.directories == {}
+
+
+def test_index_rescans_recently_modified(wide_tree, count_scans):
+    index = FileIndex()
+    list(index.iter_files(".c", wide_tree))
+    scans = len(count_scans)
+    # The tree was just created, so no mtime can be trusted yet
+    list(index.iter_files(".c", wide_tree))
+    assert len(count_scans) == 2 * scans
+
+
+def test_suffix_tuple():
+    result = find_files((".c", ".h"), "src/testdir/subdir1")
+    assert sorted(result) == ["src/testdir/subdir1/a.c", "src/testdir/subdir1/a.h"]
+
+
+def test_pattern_matcher():
+    matcher = PatternMatcher([".c", "a.c", "t*", ".h", ".c"])
+    assert matcher.patterns == [".c", "a.c", "t*", ".h"]
+    assert matcher.match("a.c") == [".c", "a.c"]
+    assert matcher.match("t1.c") == [".c", "t*"]
+    assert matcher.match("t1.h") == [".h", "t*"]
+    assert matcher.match("b.cpp") == []
+
+
+def test_match_files_groups():
+    groups = match_files([".c", ".h", "t1.*", ".cpp"], "src/testdir")
+    assert groups[".c"] == find_files(".c", "src/testdir")
+    assert groups[".h"] == find_files(".h", "src/testdir")
+    assert groups["t1.*"] == ["src/testdir/t1.c", "src/testdir/t1.h"]
+    assert groups[".cpp"] == []
+
+
+def test_match_files_single_walk(wide_tree, count_scans):
+    groups = match_files([".c", ".h"], wide_tree)
+    assert len(groups[".c"]) == 30
+    assert len(groups[".h"]) == 24
+    # One scan per directory: the root, 6 d* and 24 e* directories
+    assert len(count_scans) == 31
+
+
+def test_match_files_with_workers_and_index(wide_tree, settled_index):
+    expected = match_files([".c", "*.h"], wide_tree)
+    assert match_files([".c", "*.h"], wide_tree, workers=3) == expected
+    assert match_files([".c", "*.h"], wide_tree, index=settled_index) == expected
+
+
+def test_match_files_no_patterns():
+    assert match_files([], "src/testdir") == {}
+
+
+def test_exclude_prunes_subtrees(wide_tree, count_scans):
+    result = find_files(".c", wide_tree, exclude=["e1", "e[23]"])
+    assert len(result) == 12
+    assert all(os.sep + "e1" + os.sep not in path for path in result)
+    # The root, 6 d* and 6 e0 directories, the excluded ones are never opened
+    assert len(count_scans) == 13
+
+
+def test_exclude_with_workers_and_index(wide_tree, settled_index):
+    expected = find_files(".c", wide_tree, exclude=["d0", "e*"])
+    assert len(expected) == 5
+    assert find_files(".c", wide_tree, workers=3, exclude=["d0", "e*"]) == expected
+    assert (
+        find_files(".c", wide_tree, index=settled_index, exclude=["d0", "e*"])
+        == expected
+    )
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_max_depth(wide_tree, workers):
+    assert find_files(".c", wide_tree, workers=workers, max_depth=0) == []
+    assert len(find_files(".c", wide_tree, workers=workers, max_depth=1)) == 6
+    assert len(find_files(".c", wide_tree, workers=workers, max_depth=2)) == 30
+
+
+def test_index_max_depth(wide_tree, settled_index):
+    assert len(find_files(".c", wide_tree, index=settled_index, max_depth=1)) == 6
+    assert len(find_files(".c", wide_tree, index=settled_index)) == 30
+
+
+@pytest.fixture
+def symlink_loop(wide_tree):
+    # d0/e0/up points back at the root, d1/link is a second path to d2
+    try:
+        os.symlink(wide_tree, os.path.join(wide_tree, "d0", "e0", "up"))
+        os.symlink(os.path.join(wide_tree, "d2"), os.path.join(wide_tree, "d1", "link"))
+    except (OSError, NotImplementedError):
+        pytest.skip("symlinks are not supported here")
+    return wide_tree
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_symlink_loop_terminates(symlink_loop, workers):
+    result = find_files(".c", symlink_loop, workers=workers)
+    # Every directory is walked once, through whichever path reaches it first
+    assert len(result) == 30
+    assert len(set(os.path.basename(path) for path in result)) == 30
+
+
+def test_index_symlink_loop_terminates(symlink_loop, settled_index):
+    assert len(find_files(".c", symlink_loop, index=settled_index)) == 30
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_no_follow_symlinks(symlink_loop, settled_index, workers):
+    result = find_files(".c", symlink_loop, workers=workers, follow_symlinks=False)
+    assert len(result) == 30
+    relative = [os.path.relpath(path, symlink_loop).split(os.sep) for path in result]
+    assert not any("link" in parts or "up" in parts for parts in relative)
+    assert (
+        find_files(".c", symlink_loop, index=settled_index, follow_symlinks=False)
+        == result
+    )
+
+
+class WrappedEntry:
+    """
+    A directory entry that records its stat calls.
+
+    Every entry reports the same inode number, and the stat of a directory
+    named in devices reports that device, as if it were mounted there.
+    """
+
+    def __init__(self, entry, stats, devices):
+        self.entry = entry
+        self.stats = stats
+        self.devices = devices
+
+    def __getattr__(self, name):
+        return getattr(self.entry, name)
+
+    def inode(self):
+        return 1 if self.devices else self.entry.inode()
+
+    def stat(self):
+        self.stats.append(self.entry.name)
+        if self.entry.name in self.devices:
+            return types.SimpleNamespace(st_dev=self.devices[self.entry.name], st_ino=2)
+        return self.entry.stat()
+
+
+@pytest.fixture
+def wrap_entries(monkeypatch):
+    # The names of the entries stat'ed, and the fake devices of the mounts
+    stats = []
+    devices = {}
+    scandir = os.scandir
+
+    @contextlib.contextmanager
+    def wrapping_scandir(path):
+        with scandir(path) as entries:
+            yield [WrappedEntry(entry, stats, devices) for entry in entries]
+
+    monkeypatch.setattr(os, "scandir", wrapping_scandir)
+    return stats, devices
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_symlink_free_walk_makes_no_stats(wide_tree, wrap_entries, workers):
+    stats, _ = wrap_entries
+    assert len(find_files(".c", wide_tree, workers=workers)) == 30
+    assert len(asyncio.run(collect(async_find_files(".c", wide_tree)))) == 30
+    assert stats == []
+
+
+def test_only_symlinks_are_stated(symlink_loop, wrap_entries):
+    stats, _ = wrap_entries
+    assert len(find_files(".c", symlink_loop)) == 30
+    assert sorted(stats) == ["link", "up"]
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_mount_points_are_walked(tmp_path, wrap_entries, monkeypatch, workers):
+    # Two mounts whose directories have the same inode numbers
+    stats, devices = wrap_entries
+    for mount in ("m1", "m2"):
+        (tmp_path / mount / "a").mkdir(parents=True)
+        (tmp_path / mount / "a" / f"{mount}.c").write_text("")
+        devices[mount] = len(devices) + 1000
+    mount_points = {os.path.realpath(tmp_path / mount) for mount in devices}
+    monkeypatch.setattr(src.problem_2, "_mount_points", lambda: mount_points)
+
+    result = find_files(".c", str(tmp_path), workers=workers)
+    assert sorted(map(os.path.basename, result)) == ["m1.c", "m2.c"]
+    result = asyncio.run(collect(async_find_files(".c", str(tmp_path))))
+    assert sorted(map(os.path.basename, result)) == ["m1.c", "m2.c"]
+    # Only the mount points themselves
+    assert set(stats) == {"m1", "m2"}
+
+
+async def collect(files) -> list:
+    return [path async for path in files]
+
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+def test_async_find_files(wide_tree, concurrency):
+    result = asyncio.run(
+        collect(async_find_files(".c", wide_tree, concurrency=concurrency))
+    )
+    assert sorted(result) == sorted(find_files(".c", wide_tree))
+
+
+def test_async_find_files_small_batches(tmp_path):
+    for i in range(25):
+        (tmp_path / f"{i}.c").write_text("")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "s.c").write_text("")
+    result = asyncio.run(collect(async_find_files(".c", str(tmp_path), batch_size=10)))
+    assert sorted(result) == sorted(find_files(".c", str(tmp_path)))
+
+
+def test_async_find_files_options(symlink_loop):
+    result = asyncio.run(
+        collect(async_find_files(".c", symlink_loop, exclude=["e*"], max_depth=5))
+    )
+    assert sorted(result) == sorted(
+        find_files(".c", symlink_loop, exclude=["e*"], max_depth=5)
+    )
+
+
+@pytest.fixture
+def slow_scans(monkeypatch):
+    """Make every os.scandir call block for 20ms, recording how many overlap."""
+    scandir = os.scandir
+    lock = threading.Lock()
+    state = {"active": 0, "most_active": 0, "calls": 0}
+
+    def slow_scandir(path):
+        with lock:
+            state["calls"] += 1
+            state["active"] += 1
+            state["most_active"] = max(state["most_active"], state["active"])
+        time.sleep(0.02)
+        with lock:
+            state["active"] -= 1
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", slow_scandir)
+    return state
+
+
+def test_async_find_files_keeps_loop_responsive(wide_tree, monkeypatch):
+    # The second scan blocks until a file reaches the caller while it is blocked
+    scandir = os.scandir
+    lock = threading.Lock()
+    scanned = []
+    blocked = threading.Event()
+    release = threading.Event()
+
+    def gated_scandir(path):
+        with lock:
+            scanned.append(path)
+            gated = len(scanned) == 2
+        if gated:
+            blocked.set()
+            assert release.wait(5), "no results arrived while a scan was blocked"
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", gated_scandir)
+
+    async def main():
+        result = []
+        found_while_blocked = None
+        async for path in async_find_files(".c", wide_tree, concurrency=2):
+            if blocked.is_set() and not release.is_set():
+                found_while_blocked = path
+                release.set()
+            result.append(path)
+        return result, found_while_blocked
+
+    result, found_while_blocked = asyncio.run(main())
+    assert len(result) == 30
+    assert found_while_blocked is not None
+    assert not found_while_blocked.startswith(scanned[1] + os.sep)
+
+
+def test_async_find_files_bounded_concurrency(wide_tree, slow_scans):
+    asyncio.run(collect(async_find_files(".c", wide_tree, concurrency=3)))
+    assert slow_scans["most_active"] <= 3
+
+
+def test_async_find_files_cancel(wide_tree, slow_scans):
+    async def main():
+        started = asyncio.Event()
+
+        async def walk():
+            async for _ in async_find_files(".c", wide_tree, concurrency=2):
+                started.set()
+
+        task = asyncio.ensure_future(walk())
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        calls = slow_scans["calls"]
+        await asyncio.sleep(0.1)
+        # At most the scans already running when cancelled go on to finish
+        assert slow_scans["calls"] <= calls + 2
+        return calls
+
+    assert asyncio.run(main()) < 31
+
+
+def test_async_find_files_stops_early(wide_tree, slow_scans):
+    async def main():
+        files = async_find_files(".c", wide_tree, concurrency=2)
+        first = await files.__anext__()
+        await files.aclose()
+        return first
+
+    assert asyncio.run(main()).endswith(".c")
+    assert slow_scans["calls"] < 31
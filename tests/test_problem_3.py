@@ -1,3 +1,12 @@
+import io
+import itertools
+import random
+import tracemalloc
+from collections import Counter
+
+import pytest  # type: ignore
+
+import src.problem_3
 from src.problem_3 import *
 
 
@@ -164,3 +173,381 @@ def test_huffman_decoding():
     encoded_data, tree = huffman_encoding(test)
     result = huffman_decoding(encoded_data, tree)
     assert result == "The bird is the word"
+
+
+def test_packed_encoding_matches_string_bits():
+    data = "The bird is the word"
+    encoded_data, _ = huffman_encoding(data)
+    packed, bit_length, _ = huffman_encoding(data, packed=True)
+    assert bit_length == len(encoded_data)
+    assert len(packed) == (bit_length + 7) // 8
+    padding = len(packed) * 8 - bit_length
+    assert int.from_bytes(packed, "big") >> padding == int(encoded_data, 2)
+
+
+def test_packed_round_trip():
+    data = "abracadabra, " * 500 + "the quick brown fox jumps over the lazy dog"
+    packed, bit_length, tree = huffman_encoding(data, packed=True)
+    assert isinstance(packed, bytes)
+    assert len(packed) < len(data)
+    assert huffman_decoding(packed, tree, bit_length) == data
+
+
+def test_packed_single_character():
+    packed, bit_length, tree = huffman_encoding("aaaaaaaaaa", packed=True)
+    assert bit_length == 10
+    assert len(packed) == 2
+    assert huffman_decoding(packed, tree, bit_length) == "aaaaaaaaaa"
+
+
+def test_packed_whole_bytes():
+    # Two characters of one bit each, 16 bits fill the bytes exactly
+    packed, bit_length, tree = huffman_encoding("ab" * 8, packed=True)
+    assert bit_length == 16
+    assert len(packed) == 2
+    assert huffman_decoding(packed, tree, bit_length) == "ab" * 8
+
+
+def test_bit_codes():
+    assert bit_codes({"a": "0", "b": "10", "c": "11"}) == {
+        "a": (0, 1),
+        "b": (2, 2),
+        "c": (3, 2),
+    }
+    assert bit_codes({"a": ""}) == {"a": (0, 1)}
+
+
+def skewed_text(length=5000):
+    # Doubling weights give codes up to 15 bits long
+    rng = random.Random(3)
+    return "".join(
+        rng.choices("abcdefghijklmnop", weights=[2**i for i in range(16)], k=length)
+    )
+
+
+@pytest.mark.parametrize("table_bits", [1, 3, 8, 12])
+def test_decode_table_round_trip(table_bits):
+    for data in ["The bird is the word", "ab" * 9, skewed_text()]:
+        packed, bit_length, tree = huffman_encoding(data, packed=True)
+        decoder = DecodeTable(generate_codes(tree), table_bits)
+        assert decoder.decode(packed, bit_length) == data
+        assert huffman_decoding(packed, tree, bit_length, table_bits) == data
+
+
+def test_decode_table_entries():
+    decoder = DecodeTable({"a": "0", "b": "10", "c": "11"}, table_bits=3)
+    assert decoder.table[0b000] == ("aaa", 3)
+    assert decoder.table[0b010] == ("ab", 3)
+    assert decoder.table[0b101] == ("b", 2)
+    assert decoder.table[0b110] == ("ca", 3)
+
+
+def test_decode_table_subtables():
+    codes = {"a": "0", "b": "10", "c": "110", "d": "1110", "e": "1111"}
+    decoder = DecodeTable(codes, table_bits=2)
+    assert decoder.table[0b10] == ("b", 2)
+    chars, (sub_bits, subtable) = decoder.table[0b11]
+    assert chars is None
+    assert sub_bits == 2
+    assert subtable == [("c", 1), ("c", 1), ("d", 2), ("e", 2)]
+
+
+def test_decode_table_single_character():
+    packed, bit_length, tree = huffman_encoding("aaaaaaaaaaa", packed=True)
+    decoder = DecodeTable(generate_codes(tree), table_bits=4)
+    assert decoder.decode(packed, bit_length) == "aaaaaaaaaaa"
+    with pytest.raises(ValueError):
+        decoder.decode(b"\xff\xff", 16)
+
+
+def test_canonical_codes():
+    lengths = {"a": 2, "b": 1, "c": 3, "d": 3}
+    assert canonical_codes(lengths) == {"b": "0", "a": "10", "c": "110", "d": "111"}
+
+
+def test_canonical_codes_keep_lengths():
+    data = skewed_text()
+    _, tree = huffman_encoding(data)
+    lengths = code_lengths(generate_codes(tree))
+    codes = canonical_codes(lengths)
+    assert code_lengths(codes) == lengths
+    # Prefix-free: no code starts another
+    ordered = sorted(codes.values())
+    assert not any(b.startswith(a) for a, b in zip(ordered, ordered[1:]))
+
+
+def test_header_round_trip():
+    lengths = {"a": 1, "b": 2, "é": 3, "😀": 3}
+    header = write_header(lengths)
+    assert read_header(header) == (lengths, len(header))
+    # 2 bytes per ASCII character, plus the count
+    assert len(write_header({"a": 1, "b": 1})) == 5
+
+
+def test_self_contained_round_trip():
+    for data in ["The bird is the word", "aaaaaaa", "naïve café 😀", skewed_text()]:
+        payload, tree = huffman_encoding(data, header=True)
+        assert isinstance(payload, bytes)
+        assert huffman_decoding(payload) == data
+        assert huffman_decoding(payload, table_bits=4) == data
+
+
+def test_self_contained_tree_matches_canonical_codes():
+    data = "The bird is the word"
+    payload, tree = huffman_encoding(data, header=True)
+    codes = generate_codes(tree)
+    assert codes == canonical_codes(code_lengths(codes))
+    assert tree.freq == len(data)
+    encoded_data = "".join(codes[char] for char in data)
+    assert huffman_decoding(encoded_data, tree) == data
+
+
+def test_self_contained_size():
+    data = skewed_text()
+    packed, bit_length, _ = huffman_encoding(data, packed=True)
+    payload, _ = huffman_encoding(data, header=True)
+    # A 16 character header and the bit length add under 40 bytes
+    assert len(payload) - len(packed) < 40
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 16])
+def test_stream_round_trip(chunk_size):
+    for data in ["The bird is the word", "aaaa", skewed_text()]:
+        compressed = io.BytesIO()
+        written = compress_stream(io.StringIO(data), compressed, chunk_size)
+        assert written == len(compressed.getvalue())
+        compressed.seek(0)
+        decompressed = io.StringIO()
+        assert decompress_stream(compressed, decompressed) == len(data)
+        assert decompressed.getvalue() == data
+
+
+def test_stream_empty():
+    compressed = io.BytesIO()
+    compress_stream(io.StringIO(""), compressed)
+    compressed.seek(0)
+    decompressed = io.StringIO()
+    assert decompress_stream(compressed, decompressed) == 0
+    assert decompressed.getvalue() == ""
+
+
+def test_stream_binary_files(tmp_path):
+    data = bytes(range(256)) * 20 + b"\x00" * 3000
+    (tmp_path / "data.bin").write_bytes(data)
+    with open(tmp_path / "data.bin", "rb") as source, open(
+        tmp_path / "data.huf", "wb"
+    ) as destination:
+        source.read(100)
+        # Only the rest of the file, from where source was, is compressed
+        compress_stream(source, destination, chunk_size=1000)
+    with open(tmp_path / "data.huf", "rb") as source, open(
+        tmp_path / "out.bin", "wb"
+    ) as destination:
+        decompress_stream(source, destination, table_bits=6)
+    assert (tmp_path / "out.bin").read_bytes() == data[100:]
+    assert (tmp_path / "data.huf").stat().st_size < len(data)
+
+
+def test_stream_not_huffman():
+    with pytest.raises(ValueError):
+        decompress_stream(io.BytesIO(b"PK\x03\x04"), io.StringIO())
+
+
+def test_stream_memory_bounded_by_chunk_size(tmp_path):
+    (tmp_path / "data.txt").write_text(skewed_text(1 << 19))
+    with open(tmp_path / "data.txt") as source, open(
+        tmp_path / "data.huf", "wb"
+    ) as destination:
+        tracemalloc.start()
+        compress_stream(source, destination, chunk_size=1 << 12)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    # The input is 512 kB and its encoded output over 100 kB
+    assert (tmp_path / "data.huf").stat().st_size > 100_000
+    assert peak < 100_000
+
+
+@pytest.mark.parametrize("shared", [True, False])
+@pytest.mark.parametrize("workers", [1, 2])
+def test_blocks_round_trip(shared, workers):
+    data = skewed_text(20000)
+    payload = compress_blocks(data, 3000, workers, shared)
+    assert payload.startswith(b"HUB")
+    assert decompress_blocks(payload, workers) == data
+    encoded = data.encode()
+    payload = compress_blocks(encoded, 3000, workers, shared)
+    assert decompress_blocks(payload, workers, table_bits=6) == encoded
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_blocks_memoryview(workers):
+    data = skewed_text(5000).encode()
+    payload = compress_blocks(memoryview(data), 1000, workers)
+    assert payload == compress_blocks(data, 1000, workers=1)
+    assert decompress_blocks(payload, workers) == data
+
+
+def test_blocks_shared_codebook_is_smaller():
+    data = skewed_text(20000)
+    shared = compress_blocks(data, 1000, workers=1)
+    separate = compress_blocks(data, 1000, workers=1, shared=False)
+    # Twenty headers instead of one
+    assert len(shared) < len(separate)
+
+
+def test_blocks_edge_cases():
+    assert decompress_blocks(compress_blocks("", workers=1), workers=1) == ""
+    assert decompress_blocks(compress_blocks("a", 5, workers=1), workers=1) == "a"
+    data = "abc" * 10
+    # A last block shorter than the others
+    assert decompress_blocks(compress_blocks(data, 7, workers=1), workers=1) == data
+
+
+def test_blocks_not_huffman():
+    with pytest.raises(ValueError):
+        decompress_blocks(b"HUF-something", workers=1)
+
+
+@pytest.fixture(params=["numpy", "fallback"])
+def byte_counting(request, monkeypatch):
+    if request.param == "numpy":
+        if src.problem_3.np is None:
+            pytest.skip("NumPy is not installed")
+    else:
+        monkeypatch.setattr(src.problem_3, "np", None)
+    return request.param
+
+
+def test_byte_frequency(byte_counting):
+    data = skewed_text().encode()
+    assert byte_frequency(data) == dict(Counter(data))
+    # Most values occur, so the fallback counts in one pass
+    data = bytes(range(256)) * 3 + b"\x00"
+    assert byte_frequency(memoryview(data)) == dict(Counter(data))
+    assert byte_frequency(b"") == {}
+
+
+def test_pack_bytes_matches_pack_bits(byte_counting):
+    for data in [
+        b"ab" * 9,
+        skewed_text(200_000).encode(),
+        random.Random(7).randbytes(70_000),
+    ]:
+        codes = bit_codes(generate_codes(build_tree(Counter(data))))
+        assert pack_bytes(data, codes) == pack_bits(data, codes)
+
+
+def test_bytes_round_trip(byte_counting):
+    data = random.Random(5).randbytes(5000) + b"\x00" * 5000
+    encoded_data, tree = huffman_encoding(data)
+    assert huffman_decoding(encoded_data, tree) == data
+    packed, bit_length, tree = huffman_encoding(bytearray(data), packed=True)
+    assert huffman_decoding(packed, tree, bit_length) == data
+    assert huffman_decoding(packed, tree, bit_length, table_bits=8) == data
+    payload, _ = huffman_encoding(memoryview(data), header=True)
+    assert huffman_decoding(payload) == data
+
+
+def test_bytes_single_value():
+    packed, bit_length, tree = huffman_encoding(b"\x00\x00\x00", packed=True)
+    assert huffman_decoding(packed, tree, bit_length) == b"\x00\x00\x00"
+    payload, _ = huffman_encoding(b"\x00\x00\x00", header=True)
+    assert huffman_decoding(payload) == b"\x00\x00\x00"
+
+
+def test_bytes_empty():
+    assert huffman_encoding(b"") is None
+    assert huffman_encoding(memoryview(b"")) is None
+
+
+def test_stream_and_blocks_pack_bytes(byte_counting, monkeypatch):
+    def unused(*args):
+        raise AssertionError("bytes should not be packed one code at a time")
+
+    monkeypatch.setattr(src.problem_3, "pack_bits", unused)
+    data = skewed_text().encode()
+    compressed = io.BytesIO()
+    compress_stream(io.BytesIO(data), compressed, chunk_size=1000)
+    decompressed = io.BytesIO()
+    decompress_stream(io.BytesIO(compressed.getvalue()), decompressed)
+    assert decompressed.getvalue() == data
+    for shared in (True, False):
+        payload = compress_blocks(data, 1000, workers=1, shared=shared)
+        assert decompress_blocks(payload, workers=1) == data
+
+
+def total_bits(frequency, lengths):
+    return sum(frequency[char] * length for char, length in lengths.items())
+
+
+@pytest.mark.parametrize("max_length", [4, 6, 9, 12])
+def test_limited_code_lengths(max_length):
+    frequency = Counter(skewed_text())
+    lengths = limited_code_lengths(frequency, max_length)
+    assert set(lengths) == set(frequency)
+    assert max(lengths.values()) <= max_length
+    # A complete prefix code: the Kraft sum is exactly 1
+    assert sum(2.0**-length for length in lengths.values()) == 1
+
+
+def test_limited_code_lengths_optimal():
+    frequency = {"a": 1, "b": 1, "c": 2, "d": 4, "e": 8, "f": 16}
+    lengths = limited_code_lengths(frequency, 3)
+    # Every assignment of lengths up to 3 that forms a prefix code
+    best = min(
+        total_bits(frequency, dict(zip(frequency, candidate)))
+        for candidate in itertools.product(range(1, 4), repeat=len(frequency))
+        if sum(2.0**-length for length in candidate) <= 1
+    )
+    assert total_bits(frequency, lengths) == best
+
+
+def test_limited_code_lengths_without_limit_match_huffman():
+    frequency = Counter(skewed_text())
+    huffman = code_lengths(generate_codes(build_tree(frequency)))
+    limited = limited_code_lengths(frequency, 32)
+    assert total_bits(frequency, limited) == total_bits(frequency, huffman)
+
+
+def test_limited_code_lengths_edge_cases():
+    assert limited_code_lengths({"a": 5}, 1) == {"a": 1}
+    assert limited_code_lengths({"a": 5, "b": 1}, 1) == {"a": 1, "b": 1}
+    with pytest.raises(ValueError):
+        limited_code_lengths({"a": 1, "b": 1, "c": 1}, 1)
+
+
+def test_code_length_cost():
+    frequency = Counter(skewed_text())
+    report = code_length_cost(frequency, 8)
+    assert report["longest_code"] > 8
+    assert report["limited_bits"] > report["bits"]
+    assert report["cost"] == report["limited_bits"] / report["bits"] - 1
+    assert code_length_cost(frequency, report["longest_code"])["cost"] == 0
+
+
+def test_encoding_max_code_length():
+    data = skewed_text()
+    payload, tree = huffman_encoding(data, header=True, max_code_length=8)
+    assert max(map(len, generate_codes(tree).values())) <= 8
+    # An 8 bit table needs no subtables
+    decoder = DecodeTable(generate_codes(tree), 8)
+    assert all(chars is not None for chars, _ in decoder.table)
+    assert huffman_decoding(payload, table_bits=8) == data
+    packed, bit_length, tree = huffman_encoding(data, packed=True, max_code_length=8)
+    assert huffman_decoding(packed, tree, bit_length) == data
+    encoded_data, tree = huffman_encoding(data, max_code_length=8)
+    assert huffman_decoding(encoded_data, tree) == data
+    assert len(encoded_data) == bit_length
+
+
+def test_stream_and_blocks_max_code_length():
+    data = skewed_text()
+    compressed = io.BytesIO()
+    compress_stream(io.StringIO(data), compressed, max_code_length=7)
+    compressed.seek(0)
+    decompressed = io.StringIO()
+    decompress_stream(compressed, decompressed, table_bits=7)
+    assert decompressed.getvalue() == data
+    for shared in (True, False):
+        payload = compress_blocks(data, 1000, 1, shared, max_code_length=7)
+        assert decompress_blocks(payload, 1, table_bits=7) == data